@@ -1,8 +1,22 @@
 import streamlit as st
 import pandas as pd
-from model import df, le, predict_patient, explain_text, metrics
+from model import holder, get_registry, predict_patient
+from disease_index import lookup
 
 st.set_page_config(page_title="🧠 Medical Disease Predictor", layout="wide")
+
+
+@st.cache_resource
+def load_holder():
+    # one holder per server process; newly saved model versions are swapped in without a restart
+    holder.watch()
+    return holder
+
+
+load_holder()
+registry = get_registry()
+metrics = registry.metrics
+
 st.title("🧠 Medical Disease Predictor")
 st.caption("Top 3 disease predictions with reasoning and recommendations")
 
@@ -22,8 +36,10 @@ if st.button("🔍 Predict"):
     else:
         with st.spinner("Analyzing..."):
             result = predict_patient(user_input)
+            registry = get_registry()
 
         st.success("Prediction complete!")
+        st.caption(f"Model version: `{result['ModelVersion']}`")
 
         st.subheader("🧾 Top 3 Predicted Diseases")
         top_disease_df = pd.DataFrame(
@@ -32,14 +48,21 @@ if st.button("🔍 Predict"):
         st.dataframe(top_disease_df.style.background_gradient(cmap="Greens"), use_container_width=True)
 
         for disease in top_disease_df["Disease"]:
-            subset = df[df['predicted_diseases'].str.split(',').str[0].str.strip().str.lower() == disease.lower()]
-            if not subset.empty:
-                rec = subset['recommendations'].iloc[0] if pd.notna(subset['recommendations'].iloc[0]) else "No recommendation found."
-                reason = subset['reasoning_keywords'].iloc[0] if pd.notna(subset['reasoning_keywords'].iloc[0]) else "N/A"
-                explain = subset['lime_explainability'].iloc[0] if pd.notna(subset['lime_explainability'].iloc[0]) else "N/A"
+            info = lookup(registry.disease_index, disease)
+            if info is not None:
+                rec = info["recommendations"] or "No recommendation found."
+                reason = info["reasoning_keywords"] or "N/A"
+                explain = info["lime_explainability"] or "N/A"
                 st.markdown(f"### 🩺 Disease: **{disease}**")
                 st.caption(f"🧠 **Reasoning Keywords:** {reason}")
                 st.caption(f"💡 **Recommendation:** {rec}")
                 st.caption(f"🔍 **Explainability (dataset):** {explain}")
 
         st.markdown(f"### 🔎 Uncertainty Score: `{result['Uncertainty']}`")
+
+        if result.get("SimilarCases"):
+            st.subheader("🗂️ Similar Cases in the Dataset")
+            for case in result["SimilarCases"]:
+                st.markdown(f"**{case['label']}** — similarity `{case['similarity']}`")
+                st.caption(f"📝 {case['input_text']}")
+                st.caption(f"💡 **Recommendation:** {case['recommendations'] or 'No recommendation found.'}")
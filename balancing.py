@@ -0,0 +1,37 @@
+# balancing.py
+import numpy as np
+
+
+class ClassIndex:
+    """Row positions of every class, computed once with one stable sort.
+
+    Balanced draws and class weights are then cheap NumPy operations on
+    these index arrays; the dataframe itself is never copied or resampled.
+    """
+
+    def __init__(self, labels):
+        self.classes, codes = np.unique(np.asarray(labels), return_inverse=True)
+        self.codes = codes.astype(np.int64)
+        self.counts = np.bincount(self.codes, minlength=len(self.classes))
+        order = np.argsort(self.codes, kind="stable")
+        self.indices = np.split(order, np.cumsum(self.counts)[:-1])
+
+    def sample(self, n_per_class=None, replace=True, seed=42):
+        """Shuffled positions with n_per_class rows of each class (default: the smallest class size)."""
+        rng = np.random.default_rng(seed)
+        n = int(self.counts.min()) if n_per_class is None else int(n_per_class)
+        drawn = np.concatenate([
+            rng.choice(idx, size=n, replace=replace or n > len(idx)) for idx in self.indices
+        ])
+        return rng.permutation(drawn)
+
+    def class_weights(self):
+        # sklearn's "balanced": every class carries the same total weight
+        return len(self.codes) / (len(self.classes) * self.counts)
+
+    def sample_weights(self):
+        return self.class_weights()[self.codes]
+
+
+def balanced_sample_weights(labels):
+    return ClassIndex(labels).sample_weights()
@@ -1,23 +1,28 @@
 # balancing_check.py
-import pandas as pd
 from utils import ensure_outputs_folder
+from dataset_store import load_dataset, save_dataset
+from balancing import ClassIndex
 
 ensure_outputs_folder()
 
-df = pd.read_csv("synthetic_data.csv")
-df["label"] = df["predicted_diseases"].apply(lambda x: str(x).split(",")[0].strip())
+DATA_PATH = "synthetic_data.csv"
+
+labels = load_dataset(DATA_PATH, ["label"])
 
 print("Before Balancing:")
-print(df['label'].value_counts())
+print(labels['label'].value_counts())
+
+# Simple balancing (upsample minority), drawn as row positions per class
+classes = ClassIndex(labels['label'].astype(str))
+rows = classes.sample(seed=42)
+
+print("\nPer-class training weights (used instead of resampling in model.py):")
+for name, w in zip(classes.classes, classes.class_weights()):
+    print(f"  {name}: {w:.3f}")
 
-# Simple balancing (upsample minority)
-min_size = df['label'].value_counts().min()
-df_balanced = pd.concat([
-    g.sample(n=min_size, replace=True, random_state=42)
-    for _, g in df.groupby('label')
-]).sample(frac=1, random_state=42).reset_index(drop=True)
+df_balanced = load_dataset(DATA_PATH).iloc[rows].reset_index(drop=True)
 
 print("\nAfter Balancing:")
 print(df_balanced['label'].value_counts())
 
-df_balanced.to_csv("balanced_data.csv", index=False)
+save_dataset(df_balanced, "balanced_data.csv")
@@ -0,0 +1,43 @@
+# booster_parity.py
+import time
+import numpy as np
+import lightgbm as lgb
+from loader import load_model_components, MODEL_DIR, DATA_PATH
+from dataset_store import load_dataset
+from embedding_cache import cached_encode
+from fast_booster import load_flat_forest
+from bundle import bundle_dir
+
+N_SAMPLES = 256
+BATCH_SIZES = (1, 8, 64)
+REPEATS = 20
+
+embedder, _, le, scaler = load_model_components()
+model_path = bundle_dir(MODEL_DIR)
+booster = lgb.Booster(model_file=f"{model_path}/model.txt")
+forest = load_flat_forest(model_path, booster=booster)
+forest.booster = None  # always take the flat path here
+
+df = load_dataset(DATA_PATH, ["input_text"]).sample(n=N_SAMPLES, random_state=42)
+X = scaler.transform(cached_encode(embedder, df["input_text"].astype(str).tolist()))
+
+ref = booster.predict(X)
+flat = forest.predict(X)
+print(f"Parity on {len(X)} rows, {len(forest.roots)} trees:")
+print(f"  max |p_flat - p_lgb| = {np.abs(flat - ref).max():.2e}")
+print(f"  top1_agree = {np.mean(flat.argmax(axis=1) == ref.argmax(axis=1)):.4f}")
+
+
+def latency_ms(predict, rows):
+    predict(rows)  # warm-up
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        predict(rows)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+print("Latency per call:")
+for n in BATCH_SIZES:
+    rows = X[:n]
+    lgb_ms, flat_ms = latency_ms(booster.predict, rows), latency_ms(forest.predict, rows)
+    print(f"  {n:3d} rows  lightgbm {lgb_ms:8.2f} ms  flat {flat_ms:8.2f} ms  ({lgb_ms / flat_ms:.2f}x)")
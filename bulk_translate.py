@@ -0,0 +1,83 @@
+# bulk_translate.py
+import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+WORKERS = 8
+RETRIES = 4
+BACKOFF = 0.5  # seconds before the first retry, doubled after each failure
+
+
+class Checkpoint:
+    """Append-only JSONL file of finished translations, reloaded on restart."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    self.done[rec["text"]] = rec["translation"]
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def add(self, text, translation):
+        with self._lock:
+            self.done[text] = translation
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"text": text, "translation": translation}, ensure_ascii=False) + "\n")
+
+
+def with_retries(translate, retries=RETRIES, backoff=BACKOFF, sleep=time.sleep):
+    def call(text):
+        for attempt in range(retries + 1):
+            try:
+                result = translate(text)
+                if result is None:
+                    raise ValueError("translator returned no text")
+                return result
+            except Exception:
+                if attempt == retries:
+                    raise
+                # jitter so the workers do not retry in lockstep
+                sleep(backoff * 2 ** attempt * (1 + random.random()))
+    return call
+
+
+def translate_unique(texts, translate, checkpoint_path=None, workers=WORKERS,
+                     retries=RETRIES, backoff=BACKOFF, sleep=time.sleep, progress=None):
+    """Translate each distinct string once through a bounded thread pool.
+
+    Strings already in the checkpoint are not sent again. Returns
+    (translations, failed): a dict text -> translation for everything that
+    succeeded, and a dict text -> last error for strings that ran out of
+    retries. Calls are network bound, so threads are enough.
+    """
+    checkpoint = Checkpoint(checkpoint_path)
+    unique = list(dict.fromkeys(texts))
+    pending = [t for t in unique if t not in checkpoint.done]
+    if progress is not None:
+        progress(len(unique) - len(pending))
+    call = with_retries(translate, retries=retries, backoff=backoff, sleep=sleep)
+
+    failed = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(call, t): t for t in pending}
+        for future in as_completed(futures):
+            text = futures[future]
+            try:
+                checkpoint.add(text, future.result())
+            except Exception as e:
+                failed[text] = repr(e)
+            if progress is not None:
+                progress(1)
+    return dict(checkpoint.done), failed
@@ -0,0 +1,225 @@
+# bundle.py
+import os
+import json
+import time
+import shutil
+import hashlib
+import joblib
+import numpy as np
+import pandas as pd
+
+BUNDLE_FORMAT = 1
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+ROWS_FILE = "rows.npz"
+# "size" checks every file's length on load; "full" also re-hashes the files
+BUNDLE_VERIFY = os.environ.get("BUNDLE_VERIFY", "size")
+
+
+class BundleError(RuntimeError):
+    """Saved artifacts are incomplete or do not belong together."""
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def data_fingerprint(df, columns=("input_text", "label")):
+    """Content hash of the training rows (order included)."""
+    hashed = pd.util.hash_pandas_object(df[list(columns)].astype(str), index=False)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()[:16]
+
+
+def row_hashes(df, columns=("id", "input_text", "label")):
+    """One uint64 per row, used to tell rows a model has seen from new ones."""
+    return pd.util.hash_pandas_object(df[list(columns)].astype(str), index=False).to_numpy()
+
+
+def load_row_hashes(path):
+    """{"train": hashes, "val": hashes} the bundle was trained and validated on, or None."""
+    rows_path = os.path.join(path, ROWS_FILE)
+    if not os.path.exists(rows_path):
+        return None
+    with np.load(rows_path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def _weights_id(embedder_id):
+    # "torch-<sha>" and "onnx-int8-<sha>" come from the same saved weights
+    return str(embedder_id).rsplit("-", 1)[-1] if embedder_id else None
+
+
+def current_version(model_dir):
+    path = os.path.join(model_dir, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def bundle_dir(model_dir, version=None):
+    """Directory holding the artifacts of `version` (default: the current one).
+
+    Model dirs written before bundles existed keep their files at the top
+    level; those resolve to model_dir itself.
+    """
+    version = version or current_version(model_dir)
+    if version is None:
+        return model_dir
+    return os.path.join(model_dir, VERSIONS_DIR, version)
+
+
+def read_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise BundleError(f"{path}: unsupported bundle format {manifest.get('format')}")
+    return manifest
+
+
+def verify_files(path, manifest, verify=BUNDLE_VERIFY):
+    for name, info in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path):
+            raise BundleError(f"{path}: {name} is missing")
+        if os.path.getsize(file_path) != info["size"]:
+            raise BundleError(f"{path}: {name} has the wrong size")
+        if verify == "full" and file_sha1(file_path) != info["sha1"]:
+            raise BundleError(f"{path}: {name} does not match its hash")
+
+
+def open_bundle(model_dir, version=None, verify=BUNDLE_VERIFY):
+    """(path, manifest) of a saved bundle; manifest is None for the legacy layout."""
+    path = bundle_dir(model_dir, version)
+    if not os.path.isdir(path):
+        raise BundleError(f"{path}: bundle not found")
+    manifest = read_manifest(path)
+    if manifest is None and path != model_dir:
+        raise BundleError(f"{path}: manifest is missing")
+    if manifest is not None:
+        verify_files(path, manifest, verify)
+    return path, manifest
+
+
+def output_dim(transform, n_features):
+    return transform.transform(np.zeros((1, n_features))).shape[1]
+
+
+def check_component(manifest, name, component):
+    """Raise BundleError if a loaded component disagrees with the manifest."""
+    if manifest is None:
+        return
+    if name == "embedder":
+        saved, loaded = manifest.get("embedder"), getattr(component, "cache_id", None)
+        if saved and loaded and _weights_id(saved) != _weights_id(loaded):
+            raise BundleError(f"embedder {loaded} does not match the bundle's {saved}")
+    elif name == "le":
+        if list(map(str, component.classes_)) != manifest["classes"]:
+            raise BundleError("label encoder classes do not match the manifest")
+    elif name == "scaler":
+        dim = output_dim(component, manifest["embedding_dim"])
+        if dim != manifest["num_feature"]:
+            raise BundleError(f"feature transform gives {dim} features, booster expects {manifest['num_feature']}")
+    elif name == "lgb_model":
+        num_feature = getattr(component, "num_feature", None)
+        if num_feature is not None and num_feature() != manifest["num_feature"]:
+            raise BundleError("booster feature count does not match the manifest")
+
+
+def check_consistency(embedder, lgb_model, le, scaler, manifest=None):
+    """Cross-check loaded components; the manifest adds checks where present."""
+    for name, component in (("embedder", embedder), ("lgb_model", lgb_model), ("le", le), ("scaler", scaler)):
+        check_component(manifest, name, component)
+    if hasattr(lgb_model, "num_model_per_iteration"):
+        num_class = lgb_model.num_model_per_iteration()
+    else:
+        num_class = lgb_model.num_class
+    # a binary model has one tree per iteration for two classes
+    if num_class != len(le.classes_) and not (num_class == 1 and len(le.classes_) == 2):
+        raise BundleError(f"booster has {num_class} classes, label encoder {len(le.classes_)}")
+
+
+def _write_current(model_dir, version):
+    path = os.path.join(model_dir, CURRENT_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def save_bundle(model_dir, lgb_model, le, scaler, projection, disease_index, embedder_id,
+                data_fingerprint, embedding_dim, rows=None, parent=None, **info):
+    """Write all trained artifacts as a new version and make it current.
+
+    Files are written into a staging directory that is renamed into place
+    once the manifest is on disk, and CURRENT is switched last, so readers
+    see either the previous version or the complete new one. Extra keyword
+    arguments (metrics, boosting, ...) are recorded in the manifest.
+    rows holds the train/val row hashes that incremental updates diff against.
+    """
+    from fast_booster import FlatForest, FLAT_FILE, _model_stamp
+    from projection import save_projection, feature_transform
+    from disease_index import save_disease_index
+
+    versions = os.path.join(model_dir, VERSIONS_DIR)
+    stage = os.path.join(versions, f".tmp-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(stage)
+    try:
+        lgb_model.save_model(os.path.join(stage, "model.txt"))
+        joblib.dump(le, os.path.join(stage, "label_encoder.joblib"))
+        joblib.dump(scaler, os.path.join(stage, "scaler.joblib"))
+        save_projection(projection, stage)
+        save_disease_index(disease_index, stage)
+        if rows is not None:
+            np.savez(os.path.join(stage, ROWS_FILE), **rows)
+        # pre-flattened trees, so the flat backend never has to rebuild them
+        FlatForest.from_booster(lgb_model).save(os.path.join(stage, FLAT_FILE))
+
+        files = {
+            name: {"sha1": file_sha1(os.path.join(stage, name)), "size": os.path.getsize(os.path.join(stage, name))}
+            for name in sorted(os.listdir(stage))
+        }
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{files['model.txt']['sha1'][:8]}"
+        with open(os.path.join(stage, FLAT_FILE + ".json"), "w", encoding="utf-8") as f:
+            json.dump({"stamp": _model_stamp(os.path.join(stage, "model.txt"))}, f)
+
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "version": version,
+            "parent": parent,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "classes": list(map(str, le.classes_)),
+            "embedder": embedder_id,
+            "embedding_dim": int(embedding_dim),
+            "num_feature": output_dim(feature_transform(scaler, projection), embedding_dim),
+            "data": {"fingerprint": data_fingerprint},
+            "files": files,
+            **info,
+        }
+        with open(os.path.join(stage, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(stage, os.path.join(versions, version))
+    except BaseException:
+        shutil.rmtree(stage, ignore_errors=True)
+        raise
+    _write_current(model_dir, version)
+    return version
+
+
+def list_versions(model_dir):
+    versions = os.path.join(model_dir, VERSIONS_DIR)
+    if not os.path.isdir(versions):
+        return []
+    return sorted(v for v in os.listdir(versions) if not v.startswith("."))
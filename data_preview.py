@@ -3,7 +3,7 @@ from loader import load_components
 from utils import ensure_outputs_folder
 
 ensure_outputs_folder()
-embedder, lgb_model, le, scaler, df = load_components()
+embedder, lgb_model, le, scaler, df = load_components(columns=None)
 
 print("Sample Records:")
 print(df.head(10))
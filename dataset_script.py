@@ -1,8 +1,13 @@
 import random
 import csv
 import math
+import os
+import re
+import hashlib
+import argparse
 import pandas as pd
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import itertools
 import uuid
 
@@ -587,18 +592,77 @@ def uncertainty_from_probs(probs):
 
 # function to get token set for overlap checking
 def token_set(s):
-    toks = [w.strip().lower() for w in s.replace(","," ").replace(";"," ").split() if w.strip()]
-    return set(toks)
-
-# generate dataset
-rows = []
-existing_texts_per_disease = defaultdict(list)
-global_id = 16914
-
-for disease in DISEASES:
+    # split() already drops empty/whitespace tokens, so lower-casing once is equivalent
+    return set(s.replace(","," ").replace(";"," ").lower().split())
+
+class NearDuplicateIndex:
+    """Token sets of accepted texts for one disease, with a prefix-filter index.
+
+    A previous set P is a near-duplicate of a candidate when
+    |cand & P| / |P| >= threshold, i.e. they share at least `need` tokens.
+    Any |P| - need + 1 tokens of P must then include a shared one, so only
+    that many (the rarest) tokens of P are indexed; candidates probe the
+    index with all their tokens and only the few sets found are verified.
+    """
+
+    def __init__(self, threshold=MAX_OVERLAP):
+        self.threshold = threshold
+        self.sets = []
+        self.exact = set()
+        self.postings = defaultdict(list)
+        self.token_freq = defaultdict(int)
+
+    def _need(self, n):
+        k = math.ceil(self.threshold * n)
+        # match the float comparison used by the check itself
+        while k > 0 and (k - 1) / n >= self.threshold:
+            k -= 1
+        while k / n < self.threshold:
+            k += 1
+        return k
+
+    def is_near_duplicate(self, ts):
+        if not ts:
+            return False
+        if frozenset(ts) in self.exact:
+            return True
+        checked = set()
+        for tok in ts:
+            for sid in self.postings.get(tok, ()):
+                if sid in checked:
+                    continue
+                checked.add(sid)
+                prev_ts = self.sets[sid]
+                if len(ts & prev_ts) / max(len(prev_ts), 1) >= self.threshold:
+                    return True
+        return False
+
+    def add(self, ts):
+        sid = len(self.sets)
+        self.sets.append(ts)
+        for tok in ts:
+            self.token_freq[tok] += 1
+        if not ts:
+            return
+        self.exact.add(frozenset(ts))
+        prefix_len = len(ts) - self._need(len(ts)) + 1
+        for tok in sorted(ts, key=lambda t: (self.token_freq[t], t))[:prefix_len]:
+            self.postings[tok].append(sid)
+
+COLUMNS = ["id","input_text","predicted_diseases","probabilities","lime_explainability","reasoning_keywords","recommendations","uncertainty_score","language"]
+
+# first id of the generated dataset (the bangla batch continues after the en one)
+START_ID = 16914
+
+# directory for per-disease shard files in parallel mode
+SHARD_DIR = "dataset_shards"
+
+def generate_disease(disease, target=PER_DISEASE):
+    """Rows (without ids) for one disease, drawn from the module `random` stream."""
+    rows = []
+    dup_index = NearDuplicateIndex()
     tries_total = 0
     generated = 0
-    target = PER_DISEASE
     while generated < target:
         tries_total += 1
         if tries_total > target * MAX_TRIES:
@@ -609,15 +673,7 @@ for disease in DISEASES:
         input_text = make_input_text(disease, language=lang)
         # duplicate/near-duplicate check within same disease
         ts = token_set(input_text)
-        too_similar = False
-        for prev in existing_texts_per_disease[disease]:
-            prev_ts = token_set(prev)
-            if len(prev_ts)==0: continue
-            overlap = len(ts & prev_ts) / max(len(prev_ts),1)
-            if overlap >= MAX_OVERLAP:
-                too_similar = True
-                break
-        if too_similar:
+        if dup_index.is_near_duplicate(ts):
             continue
         # build predicted labels & probs
         preds = pick_confounders(disease)
@@ -637,7 +693,6 @@ for disease in DISEASES:
         prob_str = ",".join([f"{p:.2f}" for p in probs])
         # append row
         rows.append({
-            "id": global_id,
             "input_text": input_text,
             "predicted_diseases": pred_str,
             "probabilities": prob_str,
@@ -647,11 +702,75 @@ for disease in DISEASES:
             "uncertainty_score": unc,
             "language": lang
         })
-        existing_texts_per_disease[disease].append(input_text)
-        global_id += 1
+        dup_index.add(ts)
         generated += 1
+    return rows
+
+def disease_seed(seed, disease):
+    # stable across processes and Python versions (unlike hash())
+    digest = hashlib.sha256(f"{seed}:{disease}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def shard_path(shard_dir, i, disease):
+    slug = re.sub(r"[^a-z0-9]+", "_", disease.lower()).strip("_")
+    return os.path.join(shard_dir, f"{i:03d}_{slug}.csv")
+
+def generate_shard(job):
+    i, disease, seed, per_disease, shard_dir = job
+    random.seed(disease_seed(seed, disease))
+    rows = generate_disease(disease, per_disease)
+    path = shard_path(shard_dir, i, disease)
+    pd.DataFrame(rows, columns=COLUMNS[1:]).to_csv(path, index=False, quoting=csv.QUOTE_ALL)
+    return path
+
+def merge_shards(paths, out_csv, start_id):
+    # read back as text so nothing is re-formatted on the way through
+    parts = [pd.read_csv(p, dtype=str, keep_default_na=False) for p in paths]
+    df = pd.concat(parts, ignore_index=True)
+    df.insert(0, "id", range(start_id, start_id + len(df)))
+    df.to_csv(out_csv, index=False, quoting=csv.QUOTE_ALL)
+    return df
+
+def generate_serial(per_disease, start_id):
+    # original single-stream mode: one global random.seed, diseases in order
+    rows = []
+    for disease in DISEASES:
+        rows += generate_disease(disease, per_disease)
+    df = pd.DataFrame(rows, columns=COLUMNS[1:])
+    df.insert(0, "id", range(start_id, start_id + len(df)))
+    return df
+
+def generate_sharded(seed, per_disease, start_id, workers, shard_dir, out_csv):
+    """One shard per disease, each with its own derived seed, in a process pool.
+
+    Output depends only on the seed, never on the worker count or scheduling.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    jobs = [(i, d, seed, per_disease, shard_dir) for i, d in enumerate(DISEASES)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        paths = list(pool.map(generate_shard, jobs))
+    return merge_shards(paths, out_csv, start_id)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic symptom dataset")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--per-disease", type=int, default=PER_DISEASE)
+    parser.add_argument("--start-id", type=int, default=START_ID)
+    parser.add_argument("--out", default=OUT_CSV)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="0 = original serial stream; N > 0 = sharded mode with N processes; -1 = all cores")
+    parser.add_argument("--shard-dir", default=SHARD_DIR)
+    args = parser.parse_args()
+    if args.workers < 0:
+        args.workers = os.cpu_count() or 1
+
+    if args.workers > 0:
+        df = generate_sharded(args.seed, args.per_disease, args.start_id, args.workers, args.shard_dir, args.out)
+    else:
+        random.seed(args.seed)
+        df = generate_serial(args.per_disease, args.start_id)
+        df.to_csv(args.out, index=False, quoting=csv.QUOTE_ALL)
+    print(f"Saved {len(df)} rows to {args.out}")
 
-# convert to DataFrame and save
-df = pd.DataFrame(rows, columns=["id","input_text","predicted_diseases","probabilities","lime_explainability","reasoning_keywords","recommendations","uncertainty_score","language"])
-df.to_csv(OUT_CSV, index=False, quoting=csv.QUOTE_ALL)
-print(f"Saved {len(df)} rows to {OUT_CSV}")
+if __name__ == "__main__":
+    main()
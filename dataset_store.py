@@ -0,0 +1,187 @@
+# dataset_store.py
+import os
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from disease_index import primary_disease
+
+CATEGORICAL = ("language", "label")
+PROBABILITIES = "probabilities"
+CONVERT_CHUNK_ROWS = 65536  # CSV rows held in memory while converting
+
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def parse_probabilities(series, width=None):
+    """"0.66,0.13,0.21" strings -> float32 matrix, NaN-padded to the widest row (or width)."""
+    parts = series.fillna("").astype(str).str.split(",", expand=True)
+    if width is not None:
+        parts = parts.reindex(columns=range(width))
+    return parts.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32)
+
+
+def format_probabilities(matrix):
+    # same two-decimal text dataset_script.py writes
+    return [
+        ",".join(f"{p:.2f}" for p in row if not np.isnan(p))
+        for row in matrix
+    ]
+
+
+def probability_matrix(df):
+    if len(df) == 0:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack(df[PROBABILITIES].to_numpy()).astype(np.float32, copy=False)
+
+
+def to_table(df, width=None):
+    """Typed Arrow table: categorical language/label, fixed-width probabilities.
+
+    width fixes the probabilities list size for text input (default: the widest row).
+    """
+    df = df.copy()
+    if "label" not in df.columns and "predicted_diseases" in df.columns:
+        df["label"] = primary_disease(df["predicted_diseases"])
+    for col in CATEGORICAL:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    columns = list(df.columns)
+    probs = None
+    if PROBABILITIES in columns:
+        probs = df.pop(PROBABILITIES)
+        if probs.dtype == object and len(probs) and not isinstance(probs.iloc[0], str):
+            matrix = probability_matrix(probs.to_frame())
+        else:
+            matrix = parse_probabilities(probs, width)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if probs is not None:
+        width = matrix.shape[1] if matrix.ndim == 2 else 0
+        values = pa.array(matrix.reshape(-1), type=pa.float32())
+        table = table.append_column(
+            PROBABILITIES, pa.FixedSizeListArray.from_arrays(values, width)
+        ).select(columns)
+    return table
+
+
+def _tmp_path(path):
+    # per process, so concurrent converters never write the same file
+    return f"{path}.tmp-{os.getpid()}-{time.time_ns()}"
+
+
+def write_columnar(df, path):
+    tmp = _tmp_path(path)
+    try:
+        pq.write_table(to_table(df), tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def _scan_csv(csv_path, chunk_size):
+    """(dtypes, probability width) over the whole file, as one full read would infer them.
+
+    A column that is all empty in one chunk reads as float there, so a column
+    any chunk reads as text is text, and one any chunk reads as float is float.
+    """
+    dtypes, width = {}, None
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        for col, dtype in chunk.dtypes.items():
+            if dtypes.get(col) is str or not pd.api.types.is_numeric_dtype(dtype):
+                dtypes[col] = str
+            elif dtype.kind == "f":
+                dtypes[col] = np.float64
+        if PROBABILITIES in chunk.columns:
+            counts = chunk[PROBABILITIES].dropna().astype(str).str.count(",") + 1
+            width = max(width or 0, int(counts.max()) if len(counts) else 0)
+    return dtypes, width
+
+
+def _chunk_schema(schema):
+    # Categories and dtypes are inferred per chunk; pin what can differ between chunks
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def convert_csv(csv_path, path=None, chunk_size=CONVERT_CHUNK_ROWS):
+    """Write the CSV's columnar copy, reading chunk_size rows at a time.
+
+    One pass fixes the column types, a second converts chunk by chunk into
+    a ParquetWriter, so memory stays bounded by the chunk size.
+    """
+    path = path or columnar_path(csv_path)
+    dtypes, width = _scan_csv(csv_path, chunk_size)
+    tmp = _tmp_path(path)
+    writer = None
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype=dtypes):
+            table = to_table(chunk, width)
+            if writer is None:
+                schema = _chunk_schema(table.schema)
+                writer = pq.ParquetWriter(tmp, schema)
+            writer.write_table(table.cast(schema))
+        if writer is None:
+            pq.write_table(to_table(pd.read_csv(csv_path, nrows=0), width), tmp)
+        else:
+            writer.close()
+            writer = None
+        os.replace(tmp, path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def _is_stale(csv_path, path):
+    if not os.path.exists(path):
+        return True
+    return os.path.exists(csv_path) and os.path.getmtime(path) < os.path.getmtime(csv_path)
+
+
+def load_dataset(csv_path, columns=None):
+    """Read the dataset through its columnar copy, projected to `columns`.
+
+    The CSV is converted once to a Parquet file next to it and again only
+    when the CSV is newer. `label` is always available; `probabilities`
+    comes back as one float32 array per row (see probability_matrix).
+    """
+    path = columnar_path(csv_path)
+    if _is_stale(csv_path, path):
+        convert_csv(csv_path, path)
+    return pq.read_table(path, columns=list(columns) if columns else None).to_pandas()
+
+
+def iter_dataset(csv_path, columns=None, chunk_size=8192):
+    """Yield the dataset as DataFrames of at most chunk_size rows.
+
+    Only one record batch of the projected columns is in memory at a time.
+    """
+    path = columnar_path(csv_path)
+    if _is_stale(csv_path, path):
+        convert_csv(csv_path, path)
+    parquet = pq.ParquetFile(path)
+    for batch in parquet.iter_batches(batch_size=chunk_size, columns=list(columns) if columns else None):
+        yield batch.to_pandas()
+
+
+def save_dataset(df, csv_path):
+    """Write the CSV in its original text format plus the columnar copy."""
+    out = df.copy()
+    if PROBABILITIES in out.columns and len(out) and not isinstance(out[PROBABILITIES].iloc[0], str):
+        out[PROBABILITIES] = format_probabilities(probability_matrix(out))
+    out.to_csv(csv_path, index=False)
+    write_columnar(out, columnar_path(csv_path))
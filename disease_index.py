@@ -0,0 +1,54 @@
+# disease_index.py
+import os
+import json
+import pandas as pd
+
+INDEX_FILE = "disease_index.json"
+FIELDS = ("recommendations", "reasoning_keywords", "lime_explainability")
+INDEX_COLUMNS = ("predicted_diseases",) + FIELDS
+
+
+def primary_disease(series):
+    return series.astype(str).str.split(",").str[0].str.strip()
+
+
+def build_disease_index(df):
+    """Map lower-cased primary disease -> knowledge fields of its first row."""
+    df = df.dropna(subset=["predicted_diseases"])
+    keys = primary_disease(df["predicted_diseases"]).str.lower()
+    first = df.assign(_key=keys).drop_duplicates("_key")
+
+    records = first.reindex(columns=list(FIELDS)).to_dict("records")
+    return {
+        key: {f: (v if pd.notna(v) else None) for f, v in rec.items()}
+        for key, rec in zip(first["_key"], records)
+    }
+
+
+def save_disease_index(index, model_dir):
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, INDEX_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_disease_index(model_dir):
+    path = os.path.join(model_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_or_build_disease_index(model_dir, load_df):
+    index = load_disease_index(model_dir)
+    if index is None:
+        index = build_disease_index(load_df())
+        save_disease_index(index, model_dir)
+    return index
+
+
+def lookup(index, disease):
+    return index.get(str(disease).strip().lower())
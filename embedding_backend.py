@@ -0,0 +1,188 @@
+# embedding_backend.py
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+
+# "torch" runs the saved SentenceTransformer, "onnx" the int8 ONNX Runtime export
+EMBED_BACKEND = os.environ.get("EMBED_BACKEND", "torch")
+ONNX_SUBDIR = "embedder_onnx"
+ONNX_FP32 = "model.onnx"
+ONNX_INT8 = "model.int8.onnx"
+
+
+WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+
+
+def embedder_version(embedder_dir, tag="torch"):
+    """Content hash of the saved weights, used to key cached embeddings.
+
+    The hash is remembered in a sidecar file and only recomputed when the
+    weights file changes size or mtime.
+    """
+    weights = next(
+        (os.path.join(embedder_dir, f) for f in WEIGHT_FILES
+         if os.path.exists(os.path.join(embedder_dir, f))),
+        None,
+    )
+    if weights is None:
+        return None
+    st = os.stat(weights)
+    stamp = f"{st.st_size}:{st.st_mtime_ns}"
+    sidecar = os.path.join(embedder_dir, ".version.json")
+    cached = _read_json(sidecar, {})
+    if cached.get("stamp") != stamp:
+        h = hashlib.sha1()
+        with open(weights, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        cached = {"stamp": stamp, "sha1": h.hexdigest()}
+        with open(sidecar, "w", encoding="utf-8") as f:
+            json.dump(cached, f)
+    return f"{tag}-{cached['sha1'][:16]}"
+
+
+def save_embedder(embedder, model_dir):
+    """Save embedder to model_dir/embedder unless the same weights are already there.
+
+    It is written to a staging directory first and renamed into place, so
+    other processes never load a half-written embedder. Returns its version.
+    """
+    target = os.path.join(model_dir, "embedder")
+    stage = os.path.join(model_dir, f".embedder-tmp-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(model_dir, exist_ok=True)
+    try:
+        embedder.save(stage)
+        version = embedder_version(stage)
+        if os.path.isdir(target) and embedder_version(target) == version:
+            return version
+        old = None
+        if os.path.exists(target):
+            old = os.path.join(model_dir, f".embedder-old-{os.getpid()}-{time.time_ns()}")
+            os.rename(target, old)
+        os.rename(stage, target)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+            # the ONNX export was made from the replaced weights
+            shutil.rmtree(os.path.join(model_dir, ONNX_SUBDIR), ignore_errors=True)
+        return version
+    finally:
+        shutil.rmtree(stage, ignore_errors=True)
+
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def export_onnx(embedder_dir, out_dir, quantize=True):
+    """Export the saved SentenceTransformer's transformer to ONNX (+ int8)."""
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(embedder_dir)
+    model = AutoModel.from_pretrained(embedder_dir).eval()
+
+    dummy = tokenizer(["fever and headache since yesterday"], return_tensors="pt")
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"]),
+        os.path.join(out_dir, ONNX_FP32),
+        input_names=["input_ids", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "seq"},
+            "attention_mask": {0: "batch", 1: "seq"},
+            "last_hidden_state": {0: "batch", 1: "seq"},
+        },
+        opset_version=17,
+    )
+    tokenizer.save_pretrained(out_dir)
+
+    st_config = _read_json(os.path.join(embedder_dir, "sentence_bert_config.json"), {})
+    pooling = _read_json(os.path.join(embedder_dir, "1_Pooling", "config.json"), {})
+    with open(os.path.join(out_dir, "backend_config.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "max_seq_length": st_config.get("max_seq_length", 128),
+            "pooling_mode_mean_tokens": pooling.get("pooling_mode_mean_tokens", True),
+        }, f)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(
+            os.path.join(out_dir, ONNX_FP32),
+            os.path.join(out_dir, ONNX_INT8),
+            weight_type=QuantType.QInt8,
+        )
+    return out_dir
+
+
+class OnnxEmbedder:
+    """Drop-in for SentenceTransformer.encode backed by ONNX Runtime."""
+
+    def __init__(self, onnx_dir, quantized=True):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        config = _read_json(os.path.join(onnx_dir, "backend_config.json"), {})
+        if not config.get("pooling_mode_mean_tokens", True):
+            raise ValueError("OnnxEmbedder only implements mean pooling")
+        self.max_seq_length = config.get("max_seq_length", 128)
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = ONNX_INT8 if quantized else ONNX_FP32
+        self.session = ort.InferenceSession(
+            os.path.join(onnx_dir, model_file), opts, providers=["CPUExecutionProvider"]
+        )
+        self._dim = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self):
+        return self._dim
+
+    def encode(self, sentences, batch_size=256, show_progress_bar=False, convert_to_numpy=True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self._dim), dtype=np.float32)
+
+        # Sort by length so each batch pads to a similar size
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = np.empty((len(texts), self._dim), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            enc = self.tokenizer(
+                [texts[i] for i in idx], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="np",
+            )
+            mask = enc["attention_mask"].astype(np.int64)
+            hidden = self.session.run(
+                None, {"input_ids": enc["input_ids"].astype(np.int64), "attention_mask": mask}
+            )[0]
+            mask = mask[..., None].astype(np.float32)
+            out[idx] = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return out[0] if single else out
+
+
+def load_embedder(model_dir, backend=EMBED_BACKEND, quantized=True):
+    embedder_dir = f"{model_dir}/embedder"
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer(embedder_dir)
+        embedder.cache_id = embedder_version(embedder_dir, "torch")
+        return embedder
+    if backend == "onnx":
+        onnx_dir = f"{model_dir}/{ONNX_SUBDIR}"
+        target = ONNX_INT8 if quantized else ONNX_FP32
+        if not os.path.exists(os.path.join(onnx_dir, target)):
+            export_onnx(embedder_dir, onnx_dir, quantize=quantized)
+        embedder = OnnxEmbedder(onnx_dir, quantized=quantized)
+        embedder.cache_id = embedder_version(embedder_dir, "onnx-int8" if quantized else "onnx-fp32")
+        return embedder
+    raise ValueError(f"Unknown embedding backend: {backend}")
@@ -0,0 +1,170 @@
+# embedding_cache.py
+import os
+import hashlib
+import fcntl
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+CACHE_DIR = "./cache/embeddings"
+KEY_BYTES = 20  # sha1 digest
+# rows kept per embedder (~300 MB at 384 dims); LIME perturbations would otherwise grow it forever
+MAX_ROWS = int(os.environ.get("EMBED_CACHE_MAX_ROWS", "200000"))
+
+
+class EmbeddingStore:
+    """Append-only embedding store for one embedder version.
+
+    vectors.f32 holds float32 rows and is read through a memory map;
+    keys.bin holds the sha1 of (embedder id, text) for each row, in order.
+    Several processes may share a directory: appends hold an flock on
+    .lock, pick up rows other processes added, and write at the real end
+    of the files. Vectors are written before their keys, so a row only
+    counts once both are complete. Once max_rows rows are stored, new
+    embeddings are still returned but no longer cached.
+    """
+
+    def __init__(self, embedder_id, dim, cache_dir=CACHE_DIR, max_rows=MAX_ROWS):
+        self.embedder_id = embedder_id
+        self.dim = dim
+        self.max_rows = max_rows
+        self.path = os.path.join(cache_dir, embedder_id)
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.keys_path = os.path.join(self.path, "keys.bin")
+        self.lock_path = os.path.join(self.path, ".lock")
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self.index = {}
+        self._lock = threading.Lock()
+        self._mmap = None
+        os.makedirs(self.path, exist_ok=True)
+        with self._file_lock():
+            self._refresh()
+            # A crash between the two writes leaves extra bytes in one file
+            self._truncate()
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _disk_rows(self):
+        n_keys = os.path.getsize(self.keys_path) // KEY_BYTES if os.path.exists(self.keys_path) else 0
+        n_vectors = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+        return min(n_keys, n_vectors)
+
+    def _refresh(self):
+        """Index rows appended (by any process) since this store last looked."""
+        size = self._disk_rows()
+        if size <= self.size:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self.size * KEY_BYTES)
+            keys = f.read((size - self.size) * KEY_BYTES)
+        for i in range(size - self.size):
+            self.index.setdefault(keys[i * KEY_BYTES:(i + 1) * KEY_BYTES], self.size + i)
+        self.size = size
+
+    def _truncate(self):
+        for path, nbytes in [
+            (self.keys_path, self.size * KEY_BYTES),
+            (self.vectors_path, self.size * 4 * self.dim),
+        ]:
+            if os.path.exists(path) and os.path.getsize(path) != nbytes:
+                with open(path, "r+b") as f:
+                    f.truncate(nbytes)
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.embedder_id}\0{text}".encode("utf-8")).digest()
+
+    @property
+    def vectors(self):
+        if self._mmap is None or self._mmap.shape[0] != self.size:
+            if self.size == 0:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.size, self.dim))
+        return self._mmap
+
+    def _write_at(self, path, offset, data):
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            f.seek(offset)
+            f.write(data)
+            f.truncate()
+
+    def _append(self, keys, vecs):
+        """Append rows not stored yet; returns False once the store is full."""
+        with self._file_lock():
+            self._refresh()
+            # drop torn rows a crashed writer left past the complete ones
+            self._truncate()
+            new = [i for i, k in enumerate(keys) if k not in self.index]
+            if self.size + len(new) > self.max_rows:
+                return False
+            if new:
+                vecs = np.ascontiguousarray(np.asarray(vecs)[new], dtype=np.float32)
+                self._write_at(self.vectors_path, self.size * 4 * self.dim, vecs.tobytes())
+                self._write_at(self.keys_path, self.size * KEY_BYTES, b"".join(keys[i] for i in new))
+                for i in new:
+                    self.index[keys[i]] = self.size
+                    self.size += 1
+        return True
+
+    def encode(self, embedder, texts, batch_size=256):
+        texts = [str(t) for t in texts]
+        keys = [self.key(t) for t in texts]
+        # the lock guards the index and files only; the transformer runs outside it
+        with self._lock:
+            if any(k not in self.index for k in keys):
+                with self._file_lock():
+                    self._refresh()
+            missing = {}
+            for k, t in zip(keys, texts):
+                if k not in self.index and k not in missing:
+                    missing[k] = t
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        vecs = None
+        if missing:
+            vecs = embedder.encode(
+                list(missing.values()), batch_size=batch_size,
+                show_progress_bar=False, convert_to_numpy=True,
+            )
+
+        with self._lock:
+            fresh = {}
+            if missing and not self._append(list(missing.keys()), vecs):
+                fresh = dict(zip(missing.keys(), np.asarray(vecs, dtype=np.float32)))
+            out = np.empty((len(keys), self.dim), dtype=np.float32)
+            cached = [i for i, k in enumerate(keys) if k not in fresh]
+            if cached:
+                rows = np.fromiter((self.index[keys[i]] for i in cached), dtype=np.int64, count=len(cached))
+                out[cached] = self.vectors[rows]
+            for i, k in enumerate(keys):
+                if k in fresh:
+                    out[i] = fresh[k]
+            return out
+
+
+_stores = {}
+
+
+def get_store(embedder):
+    embedder_id = getattr(embedder, "cache_id", None)
+    if embedder_id is None:
+        return None
+    if embedder_id not in _stores:
+        _stores[embedder_id] = EmbeddingStore(embedder_id, embedder.get_sentence_embedding_dimension())
+    return _stores[embedder_id]
+
+
+def cached_encode(embedder, texts, batch_size=256):
+    store = get_store(embedder)
+    if store is None:
+        return embedder.encode(texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+    return store.encode(embedder, texts, batch_size=batch_size)
@@ -0,0 +1,44 @@
+# embedding_parity.py
+import time
+import numpy as np
+from sklearn.metrics import accuracy_score
+from loader import load_components, MODEL_DIR
+from embedding_backend import load_embedder
+from dataset_store import load_dataset
+
+SAMPLE_PATH = "balanced_data.csv"
+N_SAMPLES = 2000
+BATCH_SIZE = 256
+
+embedder, lgb_model, le, scaler, _ = load_components()
+
+df = load_dataset(SAMPLE_PATH, ["input_text", "label"])
+df = df.sample(n=min(N_SAMPLES, len(df)), random_state=42)
+texts = df["input_text"].astype(str).tolist()
+y_true = le.transform(df["label"])
+
+results = {}
+for name, emb in [
+    ("torch", load_embedder(MODEL_DIR, backend="torch")),
+    ("onnx-fp32", load_embedder(MODEL_DIR, backend="onnx", quantized=False)),
+    ("onnx-int8", load_embedder(MODEL_DIR, backend="onnx", quantized=True)),
+]:
+    emb.encode(texts[:BATCH_SIZE], batch_size=BATCH_SIZE)  # warm-up
+    start = time.perf_counter()
+    vecs = emb.encode(texts, batch_size=BATCH_SIZE, show_progress_bar=False, convert_to_numpy=True)
+    elapsed = time.perf_counter() - start
+    preds = np.argmax(lgb_model.predict(scaler.transform(vecs)), axis=1)
+    results[name] = (vecs, preds, len(texts) / elapsed)
+
+ref_vecs, ref_preds, ref_tput = results["torch"]
+print(f"Parity on {len(texts)} rows of {SAMPLE_PATH}:")
+for name, (vecs, preds, tput) in results.items():
+    cos = np.sum(vecs * ref_vecs, axis=1) / (
+        np.linalg.norm(vecs, axis=1) * np.linalg.norm(ref_vecs, axis=1) + 1e-12
+    )
+    print(
+        f"  {name:10s} cos(mean/min)={cos.mean():.4f}/{cos.min():.4f} "
+        f"top1_agree={np.mean(preds == ref_preds):.4f} "
+        f"acc={accuracy_score(y_true, preds):.4f} "
+        f"{tput:.0f} texts/s ({tput / ref_tput:.2f}x)"
+    )
@@ -1,60 +1,92 @@
+import argparse
 import pandas as pd
 from tqdm import tqdm
-from deep_translator import GoogleTranslator
+from translation_cache import cached_translate
+from bulk_translate import translate_unique, WORKERS, RETRIES
 
 # === CONFIG ===
 DATA_PATH = "synthetic_medical_dataset_50x500.csv"
 SAVE_PATH = "augmented_multilingual_dataset.csv"
+CHECKPOINT_PATH = "./cache/en_to_bn.checkpoint.jsonl"
 SOURCE_LANG = "en"
 TARGET_LANG = "bn"
+FIELDS = ["input_text", "reasoning_keywords", "recommendations"]
 
-# === LOAD DATA ===
-df = pd.read_csv(DATA_PATH)
 
-# Ensure 'language' column exists
-if "language" not in df.columns:
-    raise ValueError("❌ 'language' column not found in CSV. Add it before running.")
+# === TRANSLATOR INIT ===
+def translate(text):
+    return cached_translate(text, source=SOURCE_LANG, target=TARGET_LANG)
 
-# === FILTER ONLY ENGLISH ROWS ===
-english_rows = df[df["language"] == SOURCE_LANG].copy()
-print(f"Found {len(english_rows)} English rows to translate...")
 
-# === TRANSLATOR INIT ===
-translator = GoogleTranslator(source=SOURCE_LANG, target=TARGET_LANG)
-
-translated_rows = []
-next_id = df["id"].max() + 1 if "id" in df.columns else 1
-
-# === TRANSLATE ENGLISH → BANGLA ===
-for _, row in tqdm(english_rows.iterrows(), total=len(english_rows)):
-    try:
-        # Core translations
-        input_text_bn = translator.translate(row["input_text"])
-        reasoning_bn = translator.translate(row["reasoning_keywords"])
-        recommendations_bn = translator.translate(row["recommendations"])
-
-        new_row = row.copy()
-        new_row["id"] = next_id
-        next_id += 1
-
-        # Replace texts with translated Bangla
-        new_row["input_text"] = input_text_bn
-        new_row["reasoning_keywords"] = reasoning_bn
-        new_row["recommendations"] = recommendations_bn
-        new_row["language"] = TARGET_LANG
-
-        translated_rows.append(new_row)
-
-    except Exception as e:
-        print(f"⚠️ Error translating row {row['id']}: {e}")
-        continue
-
-# === APPEND & SAVE ===
-if translated_rows:
-    translated_df = pd.DataFrame(translated_rows)
-    augmented_df = pd.concat([df, translated_df], ignore_index=True)
-    augmented_df.to_csv(SAVE_PATH, index=False)
-    print(f"\n✅ Translation complete! Added {len(translated_df)} Bangla rows.")
-    print(f"💾 Saved new dataset to: {SAVE_PATH}")
-else:
-    print("❌ No translations added.")
+def augment(df, translate=translate, checkpoint_path=CHECKPOINT_PATH, workers=WORKERS, retries=RETRIES):
+    """Return (augmented_df, failed_ids): df plus one Bangla copy per English row.
+
+    Every distinct string across FIELDS is translated once (keywords and
+    recommendations repeat per disease). Rows with a field that still fails
+    after the retries are left out and reported, and a rerun with the same
+    checkpoint only retries those strings.
+    """
+    # Ensure 'language' column exists
+    if "language" not in df.columns:
+        raise ValueError("❌ 'language' column not found in CSV. Add it before running.")
+
+    # === FILTER ONLY ENGLISH ROWS ===
+    english_rows = df[df["language"] == SOURCE_LANG].copy()
+    print(f"Found {len(english_rows)} English rows to translate...")
+
+    texts = pd.unique(english_rows[FIELDS].to_numpy().ravel())
+    texts = [t for t in texts if isinstance(t, str) and t.strip()]
+    print(f"{len(texts)} distinct strings across {FIELDS}")
+
+    # === TRANSLATE ENGLISH → BANGLA ===
+    with tqdm(total=len(texts)) as bar:
+        translations, failed = translate_unique(
+            texts, translate, checkpoint_path=checkpoint_path,
+            workers=workers, retries=retries, progress=bar.update,
+        )
+    for text, error in list(failed.items())[:5]:
+        print(f"⚠️ Error translating {text[:60]!r}: {error}")
+
+    # Replace texts with translated Bangla; untranslatable blanks stay as they are
+    translated = english_rows[FIELDS].apply(lambda col: col.map(lambda t: translations.get(t, t)))
+    ok = english_rows[FIELDS].apply(lambda col: col.map(lambda t: t not in failed)).all(axis=1)
+    failed_ids = english_rows.loc[~ok, "id"].tolist() if "id" in df.columns else english_rows.index[~ok].tolist()
+
+    translated_df = english_rows[ok].copy()
+    translated_df[FIELDS] = translated[ok]
+    translated_df["language"] = TARGET_LANG
+    next_id = df["id"].max() + 1 if "id" in df.columns else 1
+    translated_df["id"] = range(next_id, next_id + len(translated_df))
+
+    return pd.concat([df, translated_df], ignore_index=True), failed_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add Bangla translations of the English rows")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--out", default=SAVE_PATH)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--retries", type=int, default=RETRIES)
+    args = parser.parse_args()
+
+    # === LOAD DATA ===
+    df = pd.read_csv(args.data)
+    augmented_df, failed_ids = augment(
+        df, checkpoint_path=args.checkpoint, workers=args.workers, retries=args.retries
+    )
+
+    # === APPEND & SAVE ===
+    added = len(augmented_df) - len(df)
+    if failed_ids:
+        print(f"⚠️ {len(failed_ids)} rows skipped after retries (ids: {failed_ids[:10]}...). Rerun to retry them.")
+    if added:
+        augmented_df.to_csv(args.out, index=False)
+        print(f"\n✅ Translation complete! Added {added} Bangla rows.")
+        print(f"💾 Saved new dataset to: {args.out}")
+    else:
+        print("❌ No translations added.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# evaluation.py
+import numpy as np
+
+
+class StreamingEvaluator:
+    """Accumulates classification metrics chunk by chunk in O(classes^2) memory.
+
+    Only the confusion matrix and the running log-loss sum are kept, so the
+    per-row predictions and probabilities of a chunk can be dropped as soon
+    as update() returns. The results match sklearn's confusion_matrix,
+    classification_report(output_dict=True) and log_loss on the full data.
+    """
+
+    def __init__(self, class_names):
+        self.class_names = [str(c) for c in class_names]
+        n = len(self.class_names)
+        self.cm = np.zeros((n, n), dtype=np.int64)
+        self.loss_sum = 0.0
+        self.count = 0
+
+    def update(self, y_true, probs):
+        y_true = np.asarray(y_true, dtype=np.int64)
+        probs = np.asarray(probs, dtype=np.float64)
+        n = len(self.class_names)
+        y_pred = np.argmax(probs, axis=1)
+        self.cm += np.bincount(y_true * n + y_pred, minlength=n * n).reshape(n, n)
+
+        # sklearn's log_loss: renormalize rows, clip to float eps
+        eps = np.finfo(probs.dtype).eps
+        p_true = probs[np.arange(len(y_true)), y_true] / probs.sum(axis=1)
+        self.loss_sum -= np.log(np.clip(p_true, eps, 1 - eps)).sum()
+        self.count += len(y_true)
+        return y_pred
+
+    def confusion_matrix(self, normalize=None):
+        cm = self.cm.astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if normalize == "true":
+                cm = cm / cm.sum(axis=1, keepdims=True)
+            elif normalize == "pred":
+                cm = cm / cm.sum(axis=0, keepdims=True)
+            elif normalize == "all":
+                cm = cm / cm.sum()
+            else:
+                return self.cm.copy()
+        return np.nan_to_num(cm)
+
+    def log_loss(self):
+        return self.loss_sum / self.count if self.count else float("nan")
+
+    def report(self):
+        tp = np.diag(self.cm).astype(np.float64)
+        support = self.cm.sum(axis=1)
+        predicted = self.cm.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.nan_to_num(tp / predicted)
+            recall = np.nan_to_num(tp / support)
+            f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+
+        report = {
+            name: {
+                "precision": float(precision[i]),
+                "recall": float(recall[i]),
+                "f1-score": float(f1[i]),
+                "support": float(support[i]),
+            }
+            for i, name in enumerate(self.class_names)
+        }
+        total = support.sum()
+        report["accuracy"] = float(tp.sum() / total) if total else 0.0
+        n = len(self.class_names)
+        weighted = support / total if total else np.zeros(n)
+        for name, weights in (("macro avg", np.full(n, 1.0 / n)), ("weighted avg", weighted)):
+            report[name] = {
+                "precision": float(precision @ weights),
+                "recall": float(recall @ weights),
+                "f1-score": float(f1 @ weights),
+                "support": float(total),
+            }
+        return report
@@ -0,0 +1,62 @@
+# explain.py
+import numpy as np
+
+SAMPLE_BUDGET = 5000
+START_SAMPLES = 500
+# relative change in the top feature weights below which an explanation is stable
+STABILITY_TOL = 0.05
+BATCH_SIZE = 1024
+
+
+def deduplicated(predict_proba, batch_size=BATCH_SIZE):
+    """Wrap predict_proba so each distinct perturbed string is scored once."""
+    def wrapped(texts):
+        positions = {}
+        inverse = np.fromiter(
+            (positions.setdefault(t, len(positions)) for t in texts), dtype=np.int64, count=len(texts)
+        )
+        probs = predict_proba(list(positions), batch_size=batch_size)
+        return probs[inverse]
+    return wrapped
+
+
+def _weights(exp, label, num_features):
+    return dict(exp.as_list(label=label)[:num_features])
+
+
+def _is_stable(prev, curr, tol):
+    # Features that drop out of the top list count as weight 0
+    if prev is None:
+        return False
+    scale = max(max(abs(w) for w in curr.values()), 1e-12)
+    drift = max(abs(prev.get(f, 0.0) - curr.get(f, 0.0)) for f in set(prev) | set(curr))
+    return drift / scale <= tol
+
+
+def explain_fast(explainer, text, predict_proba, num_features=5, budget=SAMPLE_BUDGET,
+                 start_samples=START_SAMPLES, tol=STABILITY_TOL):
+    """LIME explanation for the top predicted label with early stopping.
+
+    Runs explain_instance with a doubling sample count (start_samples, 2x,
+    ...) and stops once the top feature weights stop moving. Every round
+    draws fresh perturbations, so all rounds count against budget; the
+    doubling stops when the remaining budget cannot fund a larger round.
+    Returns the last lime Explanation and the label it explains.
+    """
+    predict = deduplicated(predict_proba)
+    label = int(np.argmax(predict([text])[0]))
+
+    prev, exp = None, None
+    n = min(start_samples, budget)
+    spent = 0
+    while True:
+        exp = explainer.explain_instance(
+            text, predict, labels=(label,), num_features=num_features, num_samples=n
+        )
+        spent += n
+        curr = _weights(exp, label, num_features)
+        next_n = min(n * 2, budget - spent)
+        if next_n <= n or _is_stable(prev, curr, tol):
+            break
+        prev, n = curr, next_n
+    return exp, label
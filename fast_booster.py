@@ -0,0 +1,337 @@
+# fast_booster.py
+import os
+import json
+import numpy as np
+
+# "lightgbm" predicts with the Booster, "flat" with the flattened FlatForest below
+BOOSTER_BACKEND = os.environ.get("BOOSTER_BACKEND", "lightgbm")
+FLAT_FILE = "model.flat.npz"
+# above this many rows LightGBM's row-parallel C++ loop wins again
+MAX_FLAT_ROWS = 64
+ZERO_THRESHOLD = 1e-35
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+
+
+def parse_model(model_str):
+    """Header fields and per-tree arrays from LightGBM's text model format."""
+    header, trees, tree = {}, [], None
+    for line in model_str.splitlines():
+        if line.startswith("end of trees"):
+            break
+        key, _, value = line.partition("=")
+        if key == "Tree":
+            tree = {}
+            trees.append(tree)
+        elif tree is not None:
+            if value:
+                tree[key] = value
+        else:
+            header[key] = value
+    return header, trees
+
+
+def _flatten(tree, ref, nodes):
+    """Append one (sub)tree in preorder; returns (node index, depth).
+
+    ref is a split index, or ~leaf index as in LightGBM's child arrays. Each
+    node is (feature, threshold, left, right, default_left, missing_type,
+    leaf_value, is_leaf). Leaves point to themselves, so walking past one
+    is a no-op.
+    """
+    i = len(nodes)
+    if ref < 0:
+        nodes.append((0, 0.0, i, i, True, MISSING_NONE, tree["leaf_value"][~ref], True))
+        return i, 0
+    decision = tree["decision_type"][ref]
+    if decision & 1:
+        raise NotImplementedError("categorical splits are not supported")
+    nodes.append(None)
+    left, left_depth = _flatten(tree, tree["left_child"][ref], nodes)
+    right, right_depth = _flatten(tree, tree["right_child"][ref], nodes)
+    nodes[i] = (
+        tree["split_feature"][ref], tree["threshold"][ref], left, right,
+        bool(decision & 2), (decision >> 2) & 3, 0.0, False,
+    )
+    return i, 1 + max(left_depth, right_depth)
+
+
+# 16-byte node records, four per cache line. Nodes are in preorder, so the
+# left child is always the next record and only the right one is stored.
+NODE_DTYPE = np.dtype([
+    ("threshold", np.float64), ("right", np.int32), ("feature", np.uint16), ("flags", np.uint8),
+], align=True)
+FLAG_DEFAULT_LEFT, FLAG_LEAF = 1, 2
+MISSING_SHIFT = 2
+
+
+def _walk(X, nodes, leaf_value, roots, tree_class, out):
+    # tree-major, so a tree's nodes stay in cache while every row walks it
+    for t in range(roots.shape[0]):
+        c = tree_class[t]
+        for r in range(X.shape[0]):
+            node = roots[t]
+            rec = nodes[node]
+            while not rec.flags & FLAG_LEAF:
+                x = X[r, rec.feature]
+                mt = rec.flags >> MISSING_SHIFT
+                if np.isnan(x) and mt != MISSING_NAN:
+                    x = 0.0
+                if (mt == MISSING_ZERO and abs(x) <= ZERO_THRESHOLD) or (mt == MISSING_NAN and np.isnan(x)):
+                    go_left = rec.flags & FLAG_DEFAULT_LEFT
+                else:
+                    go_left = x <= rec.threshold
+                node = node + 1 if go_left else rec.right
+                rec = nodes[node]
+            out[r, c] += leaf_value[node]
+    return out
+
+
+def pack_nodes(feature, threshold, children, default_left, missing_type, is_leaf):
+    if len(feature) and feature.max() > np.iinfo(np.uint16).max:
+        raise NotImplementedError("more than 65536 features")
+    internal = np.flatnonzero(~is_leaf)
+    if np.any(children[internal, 0] != internal + 1):
+        raise ValueError("nodes are not in preorder")
+    nodes = np.zeros(len(feature), dtype=NODE_DTYPE)
+    nodes["threshold"] = threshold
+    nodes["right"] = children[:, 1]
+    nodes["feature"] = feature
+    nodes["flags"] = (
+        default_left * FLAG_DEFAULT_LEFT + is_leaf * FLAG_LEAF
+        + (missing_type.astype(np.uint8) << MISSING_SHIFT)
+    )
+    return nodes
+
+
+_kernel = None
+
+
+def compiled_walk():
+    """_walk compiled to native code with numba, or None without numba."""
+    global _kernel
+    if _kernel is None:
+        try:
+            import numba
+            _kernel = numba.njit(cache=True, nogil=True)(_walk)
+        except ImportError:
+            _kernel = False
+    return _kernel or None
+
+
+class FlatForest:
+    """Inference-only tree ensemble as flat node arrays, for 1-64 row batches.
+
+    With numba installed the nodes are packed into 16-byte preorder records
+    and walked tree-major by a compiled loop. Without it, all trees are walked at
+    once in NumPy: each step advances every (row, tree) pair by one level,
+    so the Python loop runs max-depth times rather than once per tree.
+    Split and missing-value rules follow LightGBM's numerical decision, so
+    predict() matches Booster.predict.
+    """
+
+    ARRAYS = ("feature", "threshold", "children", "default_left", "missing_type",
+              "leaf_value", "is_leaf", "roots", "tree_class")
+
+    def __init__(self, feature, threshold, children, default_left, missing_type,
+                 leaf_value, is_leaf, roots, tree_class, num_class, objective, depth, booster=None,
+                 model_file=None, n_features=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children  # (n_nodes, 2): left, right
+        self.default_left = default_left
+        self.missing_type = missing_type
+        self.leaf_value = leaf_value
+        self.is_leaf = is_leaf
+        self.roots = roots
+        self.tree_class = tree_class
+        self.num_class = int(num_class)
+        self.objective = str(objective)
+        self.depth = int(depth)
+        self.n_features = None if n_features is None else int(n_features)
+        # NaN inputs and zero-as-missing splits need the slower exact path
+        self.needs_missing = bool(np.any(missing_type == MISSING_ZERO))
+        self._next = children.reshape(-1)
+        self._nodes = None  # packed on first compiled predict
+        self._booster = booster  # used for batches above MAX_FLAT_ROWS, if given
+        self.model_file = model_file  # ... or parsed from here on the first such batch
+
+    @property
+    def booster(self):
+        if self._booster is None and self.model_file is not None:
+            import lightgbm as lgb
+            self._booster = lgb.Booster(model_file=self.model_file)
+        return self._booster
+
+    @booster.setter
+    def booster(self, booster):
+        # None turns the LightGBM fallback off
+        self._booster = booster
+        self.model_file = None
+
+    @classmethod
+    def from_booster(cls, booster):
+        header, trees = parse_model(booster.model_to_string())
+        if "average_output" in header:
+            raise NotImplementedError("random forest boosting is not supported")
+        nodes, roots, depth = [], [], 0
+        for tree in trees:
+            arrays = {
+                key: [float(v) for v in tree[key].split()] if key in ("threshold", "leaf_value")
+                else [int(v) for v in tree[key].split()]
+                for key in ("split_feature", "threshold", "decision_type", "left_child",
+                            "right_child", "leaf_value") if key in tree
+            }
+            root, tree_depth = _flatten(arrays, 0 if int(tree["num_leaves"]) > 1 else ~0, nodes)
+            roots.append(root)
+            depth = max(depth, tree_depth)
+        cols = list(zip(*nodes)) if nodes else [()] * 8
+        per_iter = int(header["num_tree_per_iteration"])
+        return cls(
+            feature=np.asarray(cols[0], dtype=np.int64),
+            threshold=np.asarray(cols[1], dtype=np.float64),
+            children=np.stack([np.asarray(cols[2]), np.asarray(cols[3])], axis=1).astype(np.int64),
+            default_left=np.asarray(cols[4], dtype=bool),
+            missing_type=np.asarray(cols[5], dtype=np.int8),
+            leaf_value=np.asarray(cols[6], dtype=np.float64),
+            is_leaf=np.asarray(cols[7], dtype=bool),
+            roots=np.asarray(roots, dtype=np.int64),
+            tree_class=np.arange(len(roots), dtype=np.int64) % per_iter,
+            num_class=per_iter,
+            objective=header["objective"].split()[0],
+            depth=depth,
+            booster=booster,
+            n_features=int(header["max_feature_idx"]) + 1,
+        )
+
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, num_class=self.num_class, objective=self.objective, depth=self.depth,
+                 n_features=-1 if self.n_features is None else self.n_features,
+                 **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, booster=None, model_file=None):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in cls.ARRAYS}
+            n_features = int(data["n_features"]) if "n_features" in data.files else -1
+            return cls(num_class=data["num_class"], objective=data["objective"],
+                       depth=data["depth"], booster=booster, model_file=model_file,
+                       n_features=None if n_features < 0 else n_features, **arrays)
+
+    def num_feature(self):
+        if self.n_features is not None:
+            return self.n_features
+        # flat files from before n_features was stored: enough for every split
+        return int(self.feature.max()) + 1 if len(self.feature) else 0
+
+    def _step_exact(self, Xf, offset, node):
+        x = Xf[offset + self.feature[node]]
+        mt = self.missing_type[node]
+        nan = np.isnan(x)
+        x = np.where(nan & (mt != MISSING_NAN), 0.0, x)
+        use_default = ((mt == MISSING_ZERO) & (np.abs(x) <= ZERO_THRESHOLD)) | ((mt == MISSING_NAN) & nan)
+        go_right = np.where(use_default, ~self.default_left[node], x > self.threshold[node])
+        # leaves point to themselves whichever way a NaN falls
+        return self._next[2 * node + go_right]
+
+    def _step(self, Xf, offset, node):
+        return self._next[2 * node + (Xf[offset + self.feature[node]] > self.threshold[node])]
+
+    def raw_predict(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        walk = compiled_walk()
+        if walk is not None:
+            if self._nodes is None:
+                self._nodes = pack_nodes(self.feature, self.threshold, self.children,
+                                         self.default_left, self.missing_type, self.is_leaf)
+            out = np.zeros((X.shape[0], self.num_class), dtype=np.float64)
+            return walk(X, self._nodes, self.leaf_value, self.roots, self.tree_class, out)
+        return self._raw_predict_numpy(X)
+
+    def _raw_predict_numpy(self, X):
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        step = self._step_exact if self.needs_missing or np.isnan(X).any() else self._step
+        Xf = X.reshape(-1)
+
+        node = np.tile(self.roots, n_rows)
+        offset = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, n_trees)
+        final = node.copy()
+        pos = np.arange(len(node))
+        for _ in range(self.depth):
+            node = step(Xf, offset, node)
+            done = self.is_leaf[node]
+            # compact only when it pays for the extra gathers
+            if 2 * np.count_nonzero(done) > len(node):
+                final[pos[done]] = node[done]
+                keep = ~done
+                node, offset, pos = node[keep], offset[keep], pos[keep]
+                if not len(node):
+                    break
+        final[pos] = node
+
+        slot = np.repeat(np.arange(n_rows, dtype=np.int64) * self.num_class, n_trees)
+        slot += np.tile(self.tree_class, n_rows)
+        raw = np.bincount(slot, weights=self.leaf_value[final], minlength=n_rows * self.num_class)
+        return raw.reshape(n_rows, self.num_class)
+
+    def predict(self, X, raw_score=False):
+        X = np.asarray(X)
+        if X.shape[0] > MAX_FLAT_ROWS and self.booster is not None:
+            return self.booster.predict(X, raw_score=raw_score)
+        raw = self.raw_predict(X)
+        if raw_score:
+            return raw if self.num_class > 1 else raw[:, 0]
+        if self.objective in ("multiclass", "softmax"):
+            e = np.exp(raw - raw.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        if self.objective in ("binary", "cross_entropy", "xentropy"):
+            return 1.0 / (1.0 + np.exp(-raw[:, 0]))
+        if self.num_class == 1:
+            return raw[:, 0]
+        raise NotImplementedError(f"objective {self.objective} is not supported")
+
+
+def _model_stamp(model_file):
+    st = os.stat(model_file)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def load_flat_forest(model_dir, booster=None):
+    """FlatForest for model_dir/model.txt, rebuilt when model.txt changes.
+
+    With an up-to-date flat file, model.txt is only parsed if a batch too
+    large for the flat walk comes in.
+    """
+    import lightgbm as lgb
+
+    model_file = os.path.join(model_dir, "model.txt")
+    flat_file = os.path.join(model_dir, FLAT_FILE)
+    stamp_file = flat_file + ".json"
+    stamp = _model_stamp(model_file)
+    forest = None
+    if os.path.exists(flat_file) and os.path.exists(stamp_file):
+        with open(stamp_file, encoding="utf-8") as f:
+            if json.load(f).get("stamp") == stamp:
+                forest = FlatForest.load(flat_file, booster=booster, model_file=model_file)
+    if forest is None:
+        if booster is None:
+            booster = lgb.Booster(model_file=model_file)
+        forest = FlatForest.from_booster(booster)
+        forest.save(flat_file)
+        with open(stamp_file, "w", encoding="utf-8") as f:
+            json.dump({"stamp": stamp}, f)
+    # compile (or load the cached) kernel now rather than on the first request
+    forest.predict(np.zeros((1, forest.num_feature())))
+    return forest
+
+
+def load_booster(model_dir, backend=BOOSTER_BACKEND):
+    import lightgbm as lgb
+
+    if backend == "lightgbm":
+        return lgb.Booster(model_file=os.path.join(model_dir, "model.txt"))
+    if backend == "flat":
+        return load_flat_forest(model_dir)
+    raise ValueError(f"Unknown booster backend: {backend}")
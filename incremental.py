@@ -0,0 +1,191 @@
+# incremental.py
+import os
+import copy
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from sklearn.model_selection import train_test_split
+from bundle import (open_bundle, load_row_hashes, check_component, save_bundle,
+                    row_hashes, data_fingerprint, current_version, BundleError)
+from projection import PROJECTION_FILE, feature_transform
+from embedding_backend import load_embedder
+from embedding_cache import cached_encode
+from balancing import balanced_sample_weights
+from disease_index import build_disease_index
+from training import BOOSTING, DATASET_PARAMS, train_booster, evaluate_booster
+from model import load_training_frame, load_or_train_model, MODEL_DIR, DATA_PATH
+
+INCREMENT_ROUNDS = 100
+# new trees are plain gbdt: continuing dart would re-normalize (rescale) the saved trees
+CONTINUE_BOOSTING = "gbdt"
+# scaler drift (in old standard deviations) beyond which the frozen features are stale
+MAX_SCALER_SHIFT = 0.5
+VAL_FRACTION = 0.15
+DRIFT_PATH = "outputs/drift_report.csv"
+
+
+def split_new_rows(y_new, seed=42):
+    """Train/val positions for the new rows; stratified when every class allows it."""
+    positions = np.arange(len(y_new))
+    n_val = int(round(len(y_new) * VAL_FRACTION))
+    if n_val == 0:
+        return positions, positions[:0]
+    counts = np.bincount(y_new)
+    stratify = y_new if counts[counts > 0].min() >= 2 and n_val >= np.count_nonzero(counts) else None
+    return train_test_split(positions, test_size=n_val, random_state=seed, stratify=stratify)
+
+
+def drift_report(before, after):
+    """Before/after/delta per validation subset and metric."""
+    rows = []
+    for subset in after:
+        for metric, value in after[subset].items():
+            rows.append({
+                "Subset": subset,
+                "Metric": metric,
+                "Before": before[subset][metric],
+                "After": value,
+                "Delta": round(value - before[subset][metric], 4),
+            })
+    return pd.DataFrame(rows)
+
+
+def scaler_shift(old, new):
+    # largest per-dimension mean move, in units of the old standard deviation
+    return round(float(np.max(np.abs(new.mean_ - old.mean_) / np.maximum(old.scale_, 1e-12))), 4)
+
+
+def incremental_update(model_dir=MODEL_DIR, data_path=DATA_PATH, num_boost_round=INCREMENT_ROUNDS, budget=None,
+                       max_shift=MAX_SCALER_SHIFT):
+    """Add rounds to the current model for rows it has not seen yet.
+
+    Only rows whose (id, text, label) hash is not in the bundle's train/val
+    sets are embedded (older ones come from the embedding cache). The saved
+    scaler and projection stay frozen, since the existing trees split on
+    their outputs, and gbdt rounds are added to the saved model.txt on the
+    new training rows. A share of the new rows joins the validation set, and
+    both models are scored on the old and new validation rows. Returns
+    (version, drift report), or (None, None) when there is nothing new.
+
+    If the new rows would move the scaler statistics by more than
+    max_shift old standard deviations, the frozen features no longer fit
+    the data and a full retrain runs instead; it returns (version, None).
+
+    Classes the model was not trained on cannot be added this way; rows with
+    such labels are skipped and need a full retrain.
+    """
+    path, manifest = open_bundle(model_dir)
+    seen = load_row_hashes(path)
+    if manifest is None or seen is None:
+        raise BundleError(f"{path}: incremental updates need a bundle saved with row hashes; retrain fully first")
+
+    le = joblib.load(os.path.join(path, "label_encoder.joblib"))
+    scaler = joblib.load(os.path.join(path, "scaler.joblib"))
+    projection_path = os.path.join(path, PROJECTION_FILE)
+    projection = joblib.load(projection_path) if os.path.exists(projection_path) else None
+    booster = lgb.Booster(model_file=os.path.join(path, "model.txt"))
+    embedder = load_embedder(model_dir)
+    check_component(manifest, "embedder", embedder)
+
+    df = load_training_frame(data_path)
+    hashes = row_hashes(df)
+    is_new = ~np.isin(hashes, np.concatenate([seen["train"], seen["val"]]))
+    known_label = df["label"].astype(str).isin(le.classes_).to_numpy()
+    skipped = int((is_new & ~known_label).sum())
+    if skipped:
+        print(f"⚠️ Skipping {skipped} new rows with labels the model was not trained on")
+    new = np.flatnonzero(is_new & known_label)
+    if not len(new):
+        print("No new rows since the current version")
+        return None, None
+
+    y = np.full(len(df), -1, dtype=np.int64)
+    y[known_label] = le.transform(df["label"].astype(str)[known_label])
+    new_train, new_val = split_new_rows(y[new])
+    new_train, new_val = new[new_train], new[new_val]
+    old_val = np.flatnonzero(np.isin(hashes, seen["val"]))
+    print(f"➕ {len(new)} new rows: {len(new_train)} train, {len(new_val)} validation")
+
+    def embed(idx):
+        return cached_encode(embedder, df["input_text"].iloc[idx].tolist())
+
+    emb_new_train = embed(new_train)
+    # only measured: refitting the scaler would shift the features under the saved trees
+    refit = copy.deepcopy(scaler)
+    refit.partial_fit(emb_new_train)
+    shift = scaler_shift(scaler, refit)
+    if shift > max_shift:
+        print(f"⚠️ New rows shift the scaler by {shift} std (limit {max_shift}); retraining fully")
+        return full_retrain(model_dir, data_path, manifest.get("boosting"), budget), None
+    transform = feature_transform(scaler, projection)
+
+    val_sets = {"old_val": old_val, "new_val": new_val, "all_val": np.concatenate([old_val, new_val])}
+    val_emb = {name: embed(idx) for name, idx in val_sets.items() if len(idx)}
+
+    X_train = transform.transform(emb_new_train)
+    X_val = transform.transform(val_emb["all_val"])
+    # raw (not cached binary) Datasets: init_model scores them before the new rounds
+    train_data = lgb.Dataset(X_train, label=y[new_train], weight=balanced_sample_weights(y[new_train]),
+                             params=DATASET_PARAMS)
+    val_data = lgb.Dataset(X_val, label=y[val_sets["all_val"]], reference=train_data, params=DATASET_PARAMS)
+    new_booster, seconds = train_booster(
+        train_data, val_data, len(le.classes_), boosting=CONTINUE_BOOSTING,
+        num_boost_round=num_boost_round, budget=budget, init_model=booster,
+    )
+
+    features = {name: transform.transform(emb) for name, emb in val_emb.items()}
+    before = {name: evaluate_booster(booster, X, y[val_sets[name]]) for name, X in features.items()}
+    after = {name: evaluate_booster(new_booster, X, y[val_sets[name]]) for name, X in features.items()}
+    report = drift_report(before, after)
+
+    train_rows = np.concatenate([seen["train"], hashes[new_train]])
+    val_rows = np.concatenate([seen["val"], hashes[new_val]])
+    used = df.iloc[np.flatnonzero(np.isin(hashes, np.concatenate([train_rows, val_rows])))]
+    version = save_bundle(
+        model_dir, new_booster, le, scaler, projection, build_disease_index(df),
+        embedder_id=manifest["embedder"], data_fingerprint=data_fingerprint(used),
+        embedding_dim=manifest["embedding_dim"], rows={"train": train_rows, "val": val_rows},
+        parent=manifest["version"], boosting=CONTINUE_BOOSTING, metrics=after["all_val"],
+        rounds=new_booster.current_iteration(), added_rows=int(len(new)),
+        scaler_shift=shift, drift=report.to_dict("records"),
+    )
+    print(f"💾 Saved model version {version} (from {manifest['version']}, "
+          f"{new_booster.current_iteration() - booster.current_iteration()} new rounds, {seconds:.1f}s)")
+    return version, report
+
+
+def full_retrain(model_dir, data_path, boosting=None, budget=None):
+    if (model_dir, data_path) != (MODEL_DIR, DATA_PATH):
+        raise BundleError(f"a full retrain writes {MODEL_DIR} from {DATA_PATH}; run it for this data explicitly")
+    load_or_train_model(boosting=boosting or BOOSTING, budget=budget, retrain=True)
+    return current_version(model_dir)
+
+
+def main():
+    from utils import ensure_outputs_folder
+
+    parser = argparse.ArgumentParser(description="Continue training the current model on newly added rows")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--rounds", type=int, default=INCREMENT_ROUNDS)
+    parser.add_argument("--budget", type=float, default=None, help="training seconds")
+
+    parser.add_argument("--max-shift", type=float, default=MAX_SCALER_SHIFT,
+                        help="scaler drift (std) that triggers a full retrain")
+    args = parser.parse_args()
+
+    version, report = incremental_update(data_path=args.data, num_boost_round=args.rounds, budget=args.budget,
+                                         max_shift=args.max_shift)
+    if report is None:
+        return
+    ensure_outputs_folder()
+    print("\n📈 Validation drift (before = previous version, after = new version):")
+    print(report.to_string(index=False))
+    report.insert(0, "Version", version)
+    report.to_csv(DRIFT_PATH, index=False)
+    print(f"Saved {DRIFT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# lang_detect.py
+import re
+
+# Same codes the dataset uses in its `language` column
+EN, BN, BANGLISH, MIXED = "en", "bn", "banglish", "mixed"
+# mostly another script (Devanagari, Arabic, ...); the translator detects the source
+OTHER = "other"
+
+_BENGALI = re.compile(r"[\u0980-\u09FF]")
+_LATIN = re.compile(r"[A-Za-z\u00C0-\u024F]")
+_LATIN_WORD = re.compile(r"[a-z\u00C0-\u024F]+")
+
+# Latin-script Bangla cues (mostly from BN_TO_BANGLISH in dataset_script.py).
+# Words that are also common English ("pet", "alo", "rash") are left out.
+BANGLISH_WORDS = {
+    "ami", "amar", "amake", "onubhob", "korchi", "kori", "korche", "hocche", "hoise",
+    "achhe", "nai", "khub", "onek", "kichu", "theke", "dhore", "din",
+    "jor", "jôr", "jwor", "charom", "matha", "byatha", "betha", "shorir", "bomi",
+    "vhab", "kapuni", "gham", "kashi", "kof", "prosrab", "jwala", "trishna",
+    "klanti", "ozon", "koma", "gola", "nak", "hanchi", "chulkani", "lalche",
+    "drishti", "jhapsa", "ghar", "shokto", "songbedonshilota", "daktar",
+}
+
+# share of Bengali-script words from which a text counts as Bangla; Bangla
+# sentences with a few untranslated English symptom words stay "bn"
+BN_THRESHOLD = 0.5
+# share of words in other scripts above which the text counts as OTHER
+OTHER_SCRIPT_THRESHOLD = 0.3
+
+
+def detect_script_language(text):
+    """Classify by Unicode script alone; returns None for text without letters."""
+    text = str(text)
+    bn = latin = other = 0
+    for word in text.split():
+        if _BENGALI.search(word):
+            bn += 1
+        elif _LATIN.search(word):
+            latin += 1
+        elif any(ch.isalpha() for ch in word):
+            other += 1
+
+    total = bn + latin + other
+    if total == 0:
+        return None
+    if other / total > OTHER_SCRIPT_THRESHOLD:
+        return OTHER
+
+    if bn and bn / (bn + latin) >= BN_THRESHOLD:
+        return BN
+    if bn:
+        return MIXED
+    if any(w in BANGLISH_WORDS for w in _LATIN_WORD.findall(text.lower())):
+        return BANGLISH
+    return EN
+
+
+def detect_language(text, fallback=None):
+    lang = detect_script_language(text)
+    if lang is None and fallback is not None:
+        lang = fallback(text)
+    return lang or EN
+
+
+def translation_source(lang):
+    # Banglish, mixed and other-script text have no known source code; let the service decide
+    return "auto" if lang in (BANGLISH, MIXED, OTHER) else lang
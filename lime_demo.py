@@ -2,13 +2,15 @@
 from loader import load_components
 import lime.lime_text
 from utils import ensure_outputs_folder
+from embedding_cache import cached_encode
+from explain import explain_fast
 import numpy as np
 
 ensure_outputs_folder()
 embedder, lgb_model, le, scaler, df = load_components()
 
-def predict_proba(texts):
-    embeds = embedder.encode(texts)
+def predict_proba(texts, batch_size=256):
+    embeds = cached_encode(embedder, texts, batch_size=batch_size)
     scaled = scaler.transform(embeds)
     return lgb_model.predict(scaled)
 
@@ -16,6 +18,6 @@ explainer = lime.lime_text.LimeTextExplainer(class_names=le.classes_)
 
 sample = "Patient has chest pain and breathing difficulty"
 
-exp = explainer.explain_instance(sample, predict_proba, num_features=10)
+exp, label = explain_fast(explainer, sample, predict_proba, num_features=10)
 exp.save_to_file("outputs/lime_explanation.html")
 print("LIME explanation saved to outputs/lime_explanation.html")
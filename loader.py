@@ -1,29 +1,51 @@
 # loader.py
 import os
-import pandas as pd
 import joblib
-import lightgbm as lgb
-from sentence_transformers import SentenceTransformer
+from embedding_backend import load_embedder
+from fast_booster import load_booster
+from projection import load_feature_transform
+from disease_index import load_or_build_disease_index, INDEX_COLUMNS
+from dataset_store import load_dataset
+from bundle import open_bundle, bundle_dir, check_consistency
 
 MODEL_DIR = "./medical_model_fast"
 DATA_PATH = "./synthetic_data.csv"
+# what the evaluation/demo scripts read; pass columns=None for every column
+DEFAULT_COLUMNS = ("input_text", "label")
 
-def load_components():
+def load_model_components():
     os.makedirs(MODEL_DIR, exist_ok=True)
 
-    # Load embedder
-    embedder = SentenceTransformer(f"{MODEL_DIR}/embedder")
+    # Current bundle version (or the old flat layout); raises BundleError if incomplete
+    bundle_path, manifest = open_bundle(MODEL_DIR)
+
+    # Load embedder (shared by all versions)
+    embedder = load_embedder(MODEL_DIR)
 
     # Load LightGBM model
-    lgb_model = lgb.Booster(model_file=f"{MODEL_DIR}/model.txt")
+    lgb_model = load_booster(bundle_path)
+
+    # Load label encoder + scaler (with the projection folded in, if one was trained)
+    le = joblib.load(f"{bundle_path}/label_encoder.joblib")
+    scaler = load_feature_transform(bundle_path)
+
+    # Refuse components that were not trained together
+    check_consistency(embedder, lgb_model, le, scaler, manifest)
+
+    return embedder, lgb_model, le, scaler
 
-    # Load label encoder + scaler
-    le = joblib.load(f"{MODEL_DIR}/label_encoder.joblib")
-    scaler = joblib.load(f"{MODEL_DIR}/scaler.joblib")
 
-    # Load dataset
-    df = pd.read_csv(DATA_PATH)
-    # Ensure label exists
-    df["label"] = df["predicted_diseases"].apply(lambda x: str(x).split(",")[0].strip())
+def load_components(columns=DEFAULT_COLUMNS):
+    embedder, lgb_model, le, scaler = load_model_components()
+
+    # Load dataset (columnar copy, label derived at conversion)
+    df = load_dataset(DATA_PATH, columns)
 
     return embedder, lgb_model, le, scaler, df
+
+
+def load_disease_index(df=None):
+    # disease -> {recommendations, reasoning_keywords, lime_explainability}
+    return load_or_build_disease_index(
+        bundle_dir(MODEL_DIR), lambda: df if df is not None else load_dataset(DATA_PATH, INDEX_COLUMNS)
+    )
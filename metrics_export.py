@@ -1,54 +1,62 @@
 # metrics_export.py
-from loader import load_components
-import numpy as np
+import argparse
 import pandas as pd
-from sklearn.metrics import classification_report, confusion_matrix, log_loss
 import seaborn as sns
 import matplotlib.pyplot as plt
+from loader import load_model_components, DATA_PATH
 from utils import ensure_outputs_folder
-
-ensure_outputs_folder()
-embedder, lgb_model, le, scaler, df = load_components()
-
-# Generate embeddings for full df
-X_emb = embedder.encode(df['input_text'].tolist())
-X_scaled = scaler.transform(X_emb)
-
-# Predict
-pred_probs = lgb_model.predict(X_scaled)
-pred_labels = np.argmax(pred_probs, axis=1)
-
-y_true = le.transform(df['label'])
-
-# Save classification report
-report = classification_report(y_true, pred_labels, target_names=le.classes_, output_dict=True)
-pd.DataFrame(report).to_csv("outputs/classification_report.csv")
-
-# Save confusion matrix
-# cm = confusion_matrix(y_true, pred_labels)
-# plt.figure(figsize=(8,6))
-# sns.heatmap(cm, annot=True, fmt="d", cmap="Blues")
-# plt.title("Confusion Matrix")
-# plt.savefig("outputs/confusion_matrix.png")
-# plt.close()
-
-cm = confusion_matrix(y_true, pred_labels, normalize="true")
-
-plt.figure(figsize=(8, 8))
-sns.heatmap(
-    cm,
-    cmap="Blues",
-    annot=False,
-    xticklabels=False,
-    yticklabels=False
-)
-plt.title("Normalized Confusion Matrix (50 Classes)")
-plt.xlabel("Predicted")
-plt.ylabel("True")
-plt.tight_layout()
-plt.savefig("outputs/confusion_matrix_slide.png")
-plt.close()
-
-
-# Log-loss
-print("Log Loss:", log_loss(y_true, pred_probs))
+from embedding_cache import cached_encode
+from dataset_store import iter_dataset
+from evaluation import StreamingEvaluator
+
+CHUNK_SIZE = 8192
+
+
+def evaluate(embedder, lgb_model, le, scaler, data_path=DATA_PATH, chunk_size=CHUNK_SIZE):
+    """Embed, scale and predict the dataset one chunk at a time."""
+    evaluator = StreamingEvaluator(le.classes_)
+    for chunk in iter_dataset(data_path, ["input_text", "label"], chunk_size=chunk_size):
+        X_emb = cached_encode(embedder, chunk["input_text"].astype(str).tolist())
+        pred_probs = lgb_model.predict(scaler.transform(X_emb))
+        evaluator.update(le.transform(chunk["label"]), pred_probs)
+        print(f"  evaluated {evaluator.count} rows", end="\r")
+    print()
+    return evaluator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export evaluation metrics for the saved model")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    ensure_outputs_folder()
+    embedder, lgb_model, le, scaler = load_model_components()
+    evaluator = evaluate(embedder, lgb_model, le, scaler, args.data, args.chunk_size)
+
+    # Save classification report
+    pd.DataFrame(evaluator.report()).to_csv("outputs/classification_report.csv")
+
+    cm = evaluator.confusion_matrix(normalize="true")
+
+    plt.figure(figsize=(8, 8))
+    sns.heatmap(
+        cm,
+        cmap="Blues",
+        annot=False,
+        xticklabels=False,
+        yticklabels=False
+    )
+    plt.title(f"Normalized Confusion Matrix ({len(le.classes_)} Classes)")
+    plt.xlabel("Predicted")
+    plt.ylabel("True")
+    plt.tight_layout()
+    plt.savefig("outputs/confusion_matrix_slide.png")
+    plt.close()
+
+    # Log-loss
+    print("Log Loss:", evaluator.log_loss())
+
+
+if __name__ == "__main__":
+    main()
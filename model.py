@@ -1,82 +1,102 @@
 import os
+import functools
 os.environ["STREAMLIT_WATCHDOG"] = "false"
 
 import joblib
 import numpy as np
-import pandas as pd
 import lightgbm as lgb
 from sentence_transformers import SentenceTransformer
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, f1_score, log_loss
-from sklearn.utils import resample
-from deep_translator import GoogleTranslator
-from lime.lime_text import LimeTextExplainer
-import re
+from translation_cache import cached_translate_batch
+from lang_detect import detect_language as detect_script, translation_source
+from embedding_backend import load_embedder, save_embedder
+from embedding_cache import cached_encode
+from fast_booster import load_booster
+from projection import PROJECTION, PROJECTION_DIM, make_projection, feature_transform, load_feature_transform
+from explain import explain_fast, SAMPLE_BUDGET
+from training import BOOSTING, build_datasets, train_booster, evaluate_booster
+from disease_index import build_disease_index, load_or_build_disease_index, INDEX_COLUMNS
+from dataset_store import load_dataset
+from text_normalize import normalize_series
+from balancing import balanced_sample_weights
+from neighbors import load_neighbor_index
+from bundle import save_bundle, open_bundle, current_version, check_component, check_consistency, data_fingerprint, row_hashes
+import threading
 import warnings
-import matplotlib.pyplot as plt
 warnings.filterwarnings("ignore")
 
 MODEL_DIR = "./medical_model_fast"
 DATA_PATH = "./synthetic_data.csv"
 MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+TRAIN_COLUMNS = ("id", "input_text", "predicted_diseases", "recommendations",
+                 "reasoning_keywords", "lime_explainability", "language", "label")
+# the serving dataframe only backs the disease index
+SERVING_COLUMNS = INDEX_COLUMNS + ("label",)
+# "booster", "knn" (neighbour vote) or "ensemble" (mean of both); the last two need neighbors.py run once
+PREDICT_HEAD = os.environ.get("PREDICT_HEAD", "booster")
+ENSEMBLE_WEIGHT = 0.5  # booster share of the ensemble
+NUM_NEIGHBORS = 3  # similar dataset rows returned with each prediction
+# how often a watching ModelHolder checks CURRENT for a newly saved version
+POLL_SECONDS = float(os.environ.get("MODEL_POLL_SECONDS", "10"))
 
 
-def clean_text(text):
-    text = str(text).lower()
-    text = re.sub(r"http\S+|www\S+", "", text)
-    text = re.sub(r"[^a-zA-Z0-9\s]", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+def embed_texts(embedder, texts, batch_size=256):
+    return cached_encode(embedder, texts, batch_size=batch_size)
+
+
+class TrainingData:
+    """Cleaned, balanced, split, embedded and scaled training data."""
+
+    def __init__(self, df, le, embedder, scaler, projection, X_train, X_val, y_train, y_val, w_train,
+                 disease_index, train_idx, val_idx):
+        self.df = df
+        self.le = le
+        self.embedder = embedder
+        self.scaler = scaler
+        self.projection = projection
+        self.X_train = X_train
+        self.X_val = X_val
+        self.y_train = y_train
+        self.y_val = y_val
+        self.w_train = w_train
+        self.disease_index = disease_index
+        # row positions in df of each split
+        self.train_idx = train_idx
+        self.val_idx = val_idx
+
+
+def load_training_frame(data_path=DATA_PATH):
+    # Load and prepare dataset
+    df = load_dataset(data_path, TRAIN_COLUMNS).dropna(subset=["input_text"])
+    df["input_text"] = normalize_series(df["input_text"])
+    df = df[df["input_text"].str.len() > 3].reset_index(drop=True)
 
+    # categories of rows filtered out above would show up as empty groups
+    df["label"] = df["label"].cat.remove_unused_categories()
+    return df
 
-def embed_texts(embedder, texts, batch_size=256):
-    return embedder.encode(texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
-
-
-def load_or_train_model():
-    # Reuse trained model if exists
-    if (
-        os.path.exists(f"{MODEL_DIR}/model.txt")
-        and os.path.exists(f"{MODEL_DIR}/label_encoder.joblib")
-        and os.path.exists(f"{MODEL_DIR}/scaler.joblib")
-    ):
-        embedder = SentenceTransformer(f"{MODEL_DIR}/embedder")
-        lgb_model = lgb.Booster(model_file=f"{MODEL_DIR}/model.txt")
-        le = joblib.load(f"{MODEL_DIR}/label_encoder.joblib")
-        scaler = joblib.load(f"{MODEL_DIR}/scaler.joblib")
-        df = pd.read_csv(DATA_PATH)
-        metrics = None
-        return embedder, lgb_model, le, df, metrics, scaler
 
-    # Load and prepare dataset
-    df = pd.read_csv(DATA_PATH)
-    df = df[
-        ["id", "input_text", "predicted_diseases", "recommendations",
-         "reasoning_keywords", "lime_explainability", "language"]
-    ].dropna(subset=["input_text"])
-    df = df[df["input_text"].str.strip().str.len() > 3].reset_index(drop=True)
-
-    df["label"] = df["predicted_diseases"].apply(lambda x: str(x).split(",")[0].strip())
-    df["input_text"] = df["input_text"].apply(clean_text)
-
-    # Balance dataset
-    min_size = df["label"].value_counts().min()
-    df_balanced = pd.concat([
-        resample(g, replace=True, n_samples=min_size, random_state=42)
-        for _, g in df.groupby("label")
-    ])
-    df = df_balanced.sample(frac=1, random_state=42).reset_index(drop=True)
+def prepare_training_data(projection=PROJECTION, projection_dim=PROJECTION_DIM):
+    df = load_training_frame()
+    disease_index = build_disease_index(df)
 
     le = LabelEncoder()
-    df["label_enc"] = le.fit_transform(df["label"])
+    y = le.fit_transform(df["label"])
 
-    X_train, X_val, y_train, y_val = train_test_split(
-        df["input_text"], df["label_enc"],
-        test_size=0.15, random_state=42, stratify=df["label_enc"]
+    # Split row positions first, so no row can land on both sides
+    train_idx, val_idx = train_test_split(
+        np.arange(len(df)), test_size=0.15, random_state=42, stratify=y
     )
+    X_train, X_val = df["input_text"].iloc[train_idx], df["input_text"].iloc[val_idx]
+    y_train, y_val = y[train_idx], y[val_idx]
+
+    # Balance with per-class sample weights instead of duplicated rows
+    w_train = balanced_sample_weights(y_train)
 
+    # Save the embedder up front so its version keys the embedding cache
     embedder = SentenceTransformer(MODEL_NAME)
+    embedder.cache_id = save_embedder(embedder, MODEL_DIR)
     X_train_emb = embed_texts(embedder, X_train.tolist())
     X_val_emb = embed_texts(embedder, X_val.tolist())
 
@@ -85,105 +105,370 @@ def load_or_train_model():
     X_train_emb = scaler.fit_transform(X_train_emb)
     X_val_emb = scaler.transform(X_val_emb)
 
-    params = {
-        "objective": "multiclass",
-        "num_class": len(le.classes_),
-        "boosting_type": "dart",
-        "learning_rate": 0.03,
-        "num_leaves": 256,
-        "max_depth": -1,
-        "feature_fraction": 0.85,
-        "bagging_fraction": 0.85,
-        "bagging_freq": 5,
-        "min_data_in_leaf": 5,
-        "lambda_l1": 0.3,
-        "lambda_l2": 0.3,
-        "is_unbalance": True,
-        "metric": "multi_logloss",
-        "verbosity": -1,
-        "n_jobs": -1,
-        "seed": 42,
-    }
-
-    train_data = lgb.Dataset(X_train_emb, label=y_train)
-    val_data = lgb.Dataset(X_val_emb, label=y_val)
-
-    lgb_model = lgb.train(
-        params,
-        train_data,
-        valid_sets=[train_data, val_data],
-        num_boost_round=900,
-        callbacks=[
-            lgb.early_stopping(stopping_rounds=70),
-            lgb.log_evaluation(period=100),
-        ],
-    )
-
-    probs_val = lgb_model.predict(X_val_emb)
-    preds_val = np.argmax(probs_val, axis=1)
+    # Optional projection to fewer dimensions before the booster
+    projection = make_projection(projection, projection_dim)
+    if projection is not None:
+        X_train_emb = projection.fit_transform(X_train_emb)
+        X_val_emb = projection.transform(X_val_emb)
+
+    return TrainingData(df, le, embedder, scaler, projection, X_train_emb, X_val_emb,
+                        y_train, y_val, w_train, disease_index, train_idx, val_idx)
+
+
+def load_or_train_model(boosting=BOOSTING, budget=None, projection=PROJECTION, projection_dim=PROJECTION_DIM,
+                        retrain=False):
+    # Reuse trained model if exists, unless a retrain is asked for
+    if not retrain and artifacts_exist(MODEL_DIR):
+        bundle_path, manifest = open_bundle(MODEL_DIR)
+        embedder = load_embedder(MODEL_DIR)
+        lgb_model = lgb.Booster(model_file=f"{bundle_path}/model.txt")
+        le = joblib.load(f"{bundle_path}/label_encoder.joblib")
+        scaler = load_feature_transform(bundle_path)
+        check_consistency(embedder, lgb_model, le, scaler, manifest)
+        df = load_dataset(DATA_PATH, SERVING_COLUMNS)
+        metrics = None
+        disease_index = load_or_build_disease_index(bundle_path, lambda: df)
+        return embedder, lgb_model, le, df, metrics, scaler, disease_index
 
-    metrics = {
-        "Accuracy": round(accuracy_score(y_val, preds_val), 4),
-        "F1": round(f1_score(y_val, preds_val, average="weighted"), 4),
-        "LogLoss": round(log_loss(y_val, probs_val), 4),
-    }
+    data = prepare_training_data(projection, projection_dim)
+    train_data, val_data = build_datasets(data.X_train, data.y_train, data.X_val, data.y_val, data.w_train)
+    lgb_model, seconds = train_booster(train_data, val_data, len(data.le.classes_), boosting=boosting, budget=budget)
+    metrics = evaluate_booster(lgb_model, data.X_val, data.y_val)
 
-    print("\n📊 Validation Metrics:")
+    print(f"\n📊 Validation Metrics ({boosting}, {lgb_model.current_iteration()} rounds, {seconds:.1f}s):")
     for k, v in metrics.items():
         print(f"  {k}: {v}")
 
-    # Save model and components
-    os.makedirs(MODEL_DIR, exist_ok=True)
-    lgb_model.save_model(f"{MODEL_DIR}/model.txt")
-    embedder.save(f"{MODEL_DIR}/embedder")
-    joblib.dump(le, f"{MODEL_DIR}/label_encoder.joblib")
-    joblib.dump(scaler, f"{MODEL_DIR}/scaler.joblib")
-
-    return embedder, lgb_model, le, df, metrics, scaler
+    embedder, le, scaler, df, disease_index = data.embedder, data.le, data.scaler, data.df, data.disease_index
 
+    # Save model and components as a new bundle version
+    hashes = row_hashes(df)
+    version = save_bundle(
+        MODEL_DIR, lgb_model, le, scaler, data.projection, disease_index,
+        embedder_id=embedder.cache_id, data_fingerprint=data_fingerprint(df),
+        embedding_dim=scaler.n_features_in_,
+        rows={"train": hashes[data.train_idx], "val": hashes[data.val_idx]},
+        boosting=boosting, metrics=metrics, rounds=lgb_model.current_iteration(),
+    )
+    print(f"💾 Saved model version {version}")
 
-embedder, lgb_model, le, df, metrics, scaler = load_or_train_model()
+    return embedder, lgb_model, le, df, metrics, feature_transform(scaler, data.projection), disease_index
 
 
-def predict_proba(texts):
-    emb = embed_texts(embedder, texts)
-    emb = scaler.transform(emb)
-    return lgb_model.predict(emb)
+def artifacts_exist(model_dir=MODEL_DIR):
+    if not os.path.exists(f"{model_dir}/embedder"):
+        return False
+    if current_version(model_dir) is not None:
+        return True
+    # flat layout written before versioned bundles
+    return all(
+        os.path.exists(f"{model_dir}/{name}")
+        for name in ("model.txt", "label_encoder.joblib", "scaler.joblib")
+    )
 
 
-def predict_patient(input_text, top_k=3):
+class ModelRegistry:
+    """Loads each model component on first use and keeps it for the process.
+
+    Nothing is read from disk until an attribute is accessed. If the saved
+    artifacts are missing, the first access trains everything once via
+    load_or_train_model(). Instances are safe to share between Streamlit
+    sessions, e.g. returned from an st.cache_resource function.
+
+    Without a version, the registry follows CURRENT at its first access and
+    then stays on that version; ModelHolder swaps in newer ones.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, data_path=DATA_PATH, version=None):
+        self.model_dir = model_dir
+        self.data_path = data_path
+        self._pinned = version
+        self._components = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name, load):
+        if name not in self._components:
+            with self._lock:
+                if name not in self._components and not artifacts_exist(self.model_dir):
+                    self._train()
+                if name not in self._components:
+                    self._components[name] = load()
+        return self._components[name]
+
+    def _train(self):
+        embedder, lgb_model, le, df, metrics, scaler, disease_index = load_or_train_model()
+        self._components.update(
+            embedder=embedder, lgb_model=lgb_model, le=le, df=df, metrics=metrics,
+            scaler=scaler, disease_index=disease_index,
+        )
+
+    def _checked(self, name, component):
+        # each component is checked against the manifest of the bundle it came from
+        check_component(self.manifest, name, component)
+        return component
+
+    @property
+    def bundle(self):
+        # (path, manifest) of the current version; raises BundleError if incomplete
+        return self._get("bundle", lambda: open_bundle(self.model_dir, self._pinned))
+
+    @property
+    def bundle_path(self):
+        return self.bundle[0]
+
+    @property
+    def manifest(self):
+        return self.bundle[1]
+
+    @property
+    def version(self):
+        # None for a model dir in the flat pre-bundle layout
+        return self.manifest["version"] if self.manifest is not None else None
+
+    @property
+    def loaded(self):
+        return "bundle" in self._components
+
+    def share(self, other, names):
+        """Reuse components another registry has already loaded."""
+        for name in names:
+            if name in other._components:
+                self._components.setdefault(name, other._components[name])
+
+    def warm_up(self):
+        """Load everything a prediction needs and cross-check it; raises on bad artifacts."""
+        check_consistency(self.embedder, self.lgb_model, self.le, self.scaler, self.manifest)
+        self.disease_index
+        self.neighbors
+
+    @property
+    def embedder(self):
+        return self._get("embedder", lambda: self._checked("embedder", load_embedder(self.model_dir)))
+
+    @property
+    def lgb_model(self):
+        return self._get("lgb_model", lambda: self._checked("lgb_model", load_booster(self.bundle_path)))
+
+    @property
+    def le(self):
+        return self._get("le", lambda: self._checked(
+            "le", joblib.load(f"{self.bundle_path}/label_encoder.joblib")
+        ))
+
+    @property
+    def scaler(self):
+        # scaler -> projection pipeline when the model was trained on projected embeddings
+        return self._get("scaler", lambda: self._checked("scaler", load_feature_transform(self.bundle_path)))
+
+    @property
+    def df(self):
+        return self._get("df", lambda: load_dataset(self.data_path, SERVING_COLUMNS))
+
+    @property
+    def disease_index(self):
+        # Built from the dataframe only if the saved index is missing
+        return self._get(
+            "disease_index", lambda: load_or_build_disease_index(self.bundle_path, lambda: self.df)
+        )
+
+    @property
+    def neighbors(self):
+        # None until the index has been built offline with neighbors.py, or if it is stale
+        return self._get("neighbors", lambda: load_neighbor_index(self.model_dir, self.embedder, self.le.classes_))
+
+    @property
+    def metrics(self):
+        # From training in this process, else as recorded in the manifest
+        if "metrics" in self._components:
+            return self._components["metrics"]
+        return (self.manifest or {}).get("metrics") if self.loaded else None
+
+    @property
+    def explainer(self):
+        def build():
+            from lime.lime_text import LimeTextExplainer
+            return LimeTextExplainer(class_names=list(self.le.classes_))
+        return self._get("explainer", build)
+
+
+class ModelHolder:
+    """Serves one ModelRegistry at a time and swaps in newly saved versions.
+
+    reload() loads the version named by CURRENT into a fresh registry next
+    to the serving one and replaces the reference only once it is fully
+    loaded and consistent. Callers take current() once per request, so
+    in-flight predictions finish on the version they started with. watch()
+    runs reload() every POLL_SECONDS on a daemon thread. A version that
+    fails to load is remembered and not retried; the old one keeps serving.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, data_path=DATA_PATH):
+        self.model_dir = model_dir
+        self.data_path = data_path
+        self._current = ModelRegistry(model_dir, data_path)
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.failed = {}
+
+    def current(self):
+        return self._current
+
+    def reload(self, version=None):
+        """Swap in `version` (default: CURRENT); returns True if it was swapped."""
+        with self._reload_lock:
+            old = self._current
+            # the first request loads CURRENT itself (or trains); nothing to swap yet
+            if not old.loaded:
+                return False
+            version = version or current_version(self.model_dir)
+            if version is None or version == old.version or version in self.failed:
+                return False
+            new = ModelRegistry(self.model_dir, self.data_path, version=version)
+            try:
+                if old.manifest is not None and new.manifest["embedder"] == old.manifest.get("embedder"):
+                    new.share(old, ("embedder", "df"))
+                    # neighbour labels are label-encoder ints of the classes they were built with
+                    if new.manifest["classes"] == old.manifest["classes"]:
+                        new.share(old, ("neighbors",))
+                new.warm_up()
+            except Exception as e:
+                self.failed[version] = repr(e)
+                print(f"⚠️ Model version {version} not loaded, still serving {old.version}: {e!r}")
+                return False
+            self._current = new
+            print(f"🔄 Serving model version {version} (was {old.version})")
+            return True
+
+    def watch(self, interval=POLL_SECONDS):
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"⚠️ Model reload check failed: {e!r}")
+
+        self._thread = threading.Thread(target=run, name="model-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+holder = ModelHolder()
+
+
+def get_registry():
+    return holder.current()
+
+
+def booster_proba(emb, reg=None):
+    reg = reg or get_registry()
+    return reg.lgb_model.predict(reg.scaler.transform(emb))
+
+
+def predict_proba(texts, batch_size=256, reg=None):
+    reg = reg or get_registry()
+    return booster_proba(embed_texts(reg.embedder, texts, batch_size=batch_size), reg)
+
+
+def head_proba(emb, head=PREDICT_HEAD, reg=None):
+    """Class probabilities from the chosen head, plus neighbour search results if an index exists."""
+    reg = reg or get_registry()
+    index = reg.neighbors
+    if head != "booster" and index is None:
+        raise RuntimeError(f"PREDICT_HEAD={head} needs the neighbour index; run python neighbors.py")
+    sims, pos = index.search(emb) if index is not None else (None, None)
+    if head == "booster":
+        return booster_proba(emb, reg), sims, pos
+    knn = index.class_probabilities(sims, pos, len(reg.le.classes_))
+    if head == "knn":
+        return knn, sims, pos
+    if head == "ensemble":
+        return ENSEMBLE_WEIGHT * booster_proba(emb, reg) + (1 - ENSEMBLE_WEIGHT) * knn, sims, pos
+    raise ValueError(f"Unknown prediction head: {head}")
+
+
+def detect_language(text):
+    # Local script check only; other scripts come back as "other" and are translated with source="auto"
+    return detect_script(text)
+
+
+def translate_batch(texts, source):
     try:
-        detected_lang = GoogleTranslator(source="auto", target="en").detect(input_text)
+        return cached_translate_batch(texts, source=source, target="en")
     except Exception:
-        detected_lang = "en"
-
-    text_en = input_text
-    if detected_lang != "en":
-        try:
-            text_en = GoogleTranslator(source=detected_lang, target="en").translate(input_text)
-        except Exception:
-            text_en = input_text
-
-    probs = predict_proba([text_en])[0]
-    top_idx = np.argsort(probs)[::-1][:top_k]
-    top_diseases = le.inverse_transform(top_idx)
-    top_probs = [float(probs[i]) for i in top_idx]
-
-    uncertainty = round(-np.sum(probs * np.log(probs + 1e-12)), 3)
-    return {
-        "TopDiseases": dict(zip(top_diseases, top_probs)),
-        "Uncertainty": uncertainty,
-        "Detected_Language": detected_lang,
-    }
-
-
-explainer = LimeTextExplainer(class_names=list(le.classes_))
-
-def explain_text(text, num_features=5):
-    exp = explainer.explain_instance(text, predict_proba, num_features=num_features)
-    return exp.as_list()
+        return list(texts)
+
+
+def top_k_predictions(probs, top_k=3):
+    # top-k per row over the whole probability matrix
+    top_k = min(top_k, probs.shape[1])
+    part = np.argpartition(-probs, top_k - 1, axis=1)[:, :top_k]
+    part_probs = np.take_along_axis(probs, part, axis=1)
+    order = np.argsort(-part_probs, axis=1)
+    top_idx = np.take_along_axis(part, order, axis=1)
+    top_probs = np.take_along_axis(part_probs, order, axis=1)
+    uncertainty = np.round(-np.sum(probs * np.log(probs + 1e-12), axis=1), 3)
+    return top_idx, top_probs, uncertainty
+
+
+def predict_patients(texts, top_k=3, head=PREDICT_HEAD, num_neighbors=NUM_NEIGHBORS):
+    texts = list(texts)
+    langs = [detect_language(t) for t in texts]
+
+    # Translate in bulk, one request per source language
+    texts_en = list(texts)
+    by_source = {}
+    for i, lang in enumerate(langs):
+        if lang != "en":
+            by_source.setdefault(translation_source(lang), []).append(i)
+    for source, idx in by_source.items():
+        translated = translate_batch([texts[i] for i in idx], source=source)
+        for i, t in zip(idx, translated):
+            texts_en[i] = t if t else texts[i]
+
+    # one version for the whole call, even if a reload swaps in another meanwhile
+    reg = get_registry()
+    emb = embed_texts(reg.embedder, texts_en)
+    probs, sims, pos = head_proba(emb, head, reg)
+    top_idx, top_probs, uncertainty = top_k_predictions(probs, top_k)
+    names = reg.le.classes_[top_idx]
+
+    results = [
+        {
+            "TopDiseases": dict(zip(names[i], top_probs[i].astype(float).tolist())),
+            "Uncertainty": float(uncertainty[i]),
+            "Detected_Language": langs[i],
+            "ModelVersion": reg.version,
+        }
+        for i in range(len(texts))
+    ]
+    if pos is not None and num_neighbors:
+        # most similar dataset rows, with their recommendations, as evidence
+        for result, rows in zip(results, reg.neighbors.neighbor_rows(sims, pos, num_neighbors)):
+            result["SimilarCases"] = rows
+    return results
+
+
+def predict_patient(input_text, top_k=3, head=PREDICT_HEAD):
+    return predict_patients([input_text], top_k=top_k, head=head)[0]
+
+
+def explain_text(text, num_features=5, budget=SAMPLE_BUDGET):
+    reg = get_registry()
+    exp, label = explain_fast(
+        reg.explainer, text, functools.partial(predict_proba, reg=reg),
+        num_features=num_features, budget=budget,
+    )
+    return exp.as_list(label=label)
 
 def plot_metrics(metrics):
+    import matplotlib.pyplot as plt
+
     names = list(metrics.keys())
     values = list(metrics.values())
 
@@ -201,4 +486,9 @@ def plot_metrics(metrics):
     plt.tight_layout()
     plt.show()
 
-plot_metrics(metrics)
\ No newline at end of file
+
+if __name__ == "__main__":
+    registry = get_registry()
+    registry.le  # trains on first run if nothing is saved yet
+    if registry.metrics:
+        plot_metrics(registry.metrics)
@@ -0,0 +1,222 @@
+# neighbors.py
+import os
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+from dataset_store import load_dataset, write_columnar
+
+NEIGHBOR_DIR = "neighbors"
+NPROBE = 16
+NEIGHBOR_K = 20  # neighbours that vote in the kNN head
+TEMPERATURE = 0.05  # softness of the similarity-weighted vote
+ROW_COLUMNS = ["id", "input_text", "label", "recommendations"]
+
+
+def _normalize(X):
+    X = np.asarray(X, dtype=np.float32)
+    return X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+
+
+def _assign(X, centroids, chunk=4096):
+    return np.concatenate([
+        np.argmax(X[i:i + chunk] @ centroids.T, axis=1) for i in range(0, len(X), chunk)
+    ]) if len(X) else np.zeros(0, dtype=np.int64)
+
+
+def spherical_kmeans(X, nlist, iterations=10, seed=42):
+    rng = np.random.default_rng(seed)
+    centroids = X[rng.choice(len(X), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign(X, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, X)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        # reseed empty lists from random points
+        sums[empty] = X[rng.choice(len(X), size=int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def _read_meta(path):
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class NeighborIndex:
+    """IVF-flat cosine index over dataset embeddings, memory-mapped from disk.
+
+    Vectors are L2-normalized and stored grouped by their nearest k-means
+    centroid; a query scans only the nprobe closest lists. rows holds the
+    dataset rows in the same order, for returning neighbours as evidence.
+    """
+
+    def __init__(self, centroids, vectors, offsets, labels, rows=None, meta=None):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.offsets = offsets
+        self.labels = labels
+        self.rows = rows
+        self.meta = meta or {}
+
+    @classmethod
+    def build(cls, embeddings, labels, nlist=None, seed=42):
+        """Returns (index, order); order maps index positions back to input rows."""
+        X = _normalize(embeddings)
+        nlist = nlist or max(1, min(len(X), int(4 * np.sqrt(len(X)))))
+        centroids = spherical_kmeans(X, nlist, seed=seed)
+        assign = _assign(X, centroids)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+        return cls(centroids, X[order], offsets, np.asarray(labels, dtype=np.int32)[order]), order
+
+    def save(self, path, rows=None, meta=None):
+        """Write the index to path, replacing a saved one as a whole.
+
+        Files go to a staging directory that is renamed into place, so a
+        reader never pairs new arrays with old rows or meta. meta gets a
+        "build" id that load() uses to detect a swap while it reads.
+        """
+        stage = f"{path}.tmp-{os.getpid()}-{time.time_ns()}"
+        os.makedirs(stage)
+        old = None
+        try:
+            for name in ("centroids", "vectors", "offsets", "labels"):
+                np.save(os.path.join(stage, f"{name}.npy"), getattr(self, name))
+            if rows is not None:
+                write_columnar(rows, os.path.join(stage, "rows.parquet"))
+            with open(os.path.join(stage, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({**(meta or {}), "build": time.time_ns()}, f)
+            if os.path.exists(path):
+                old = f"{path}.old-{os.getpid()}-{time.time_ns()}"
+                os.rename(path, old)
+            os.rename(stage, path)
+        finally:
+            shutil.rmtree(stage, ignore_errors=True)
+            if old is not None:
+                shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, attempts=3):
+        for attempt in range(attempts):
+            try:
+                meta = _read_meta(path)
+                arrays = {
+                    name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                    for name in ("centroids", "vectors", "offsets", "labels")
+                }
+                rows = None
+                if os.path.exists(os.path.join(path, "rows.parquet")):
+                    import pandas as pd
+                    rows = pd.read_parquet(os.path.join(path, "rows.parquet"))
+                # unchanged build: every file came from the same save
+                if _read_meta(path).get("build") == meta.get("build"):
+                    return cls(rows=rows, meta=meta, **arrays)
+            except FileNotFoundError:
+                # caught between the two renames of a save
+                if attempt == attempts - 1:
+                    raise
+            time.sleep(0.1)
+        raise RuntimeError(f"{path}: index kept changing while loading")
+
+    def search(self, queries, k=NEIGHBOR_K, nprobe=NPROBE):
+        """Top-k (similarities, positions) per query, both shaped (n, k)."""
+        Q = _normalize(queries)
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(-(Q @ np.asarray(self.centroids).T), nprobe - 1, axis=1)[:, :nprobe]
+        sims = np.full((len(Q), k), -np.inf, dtype=np.float32)
+        pos = np.full((len(Q), k), -1, dtype=np.int64)
+        for i, lists in enumerate(probe):
+            cand = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in lists])
+            if not len(cand):
+                continue
+            s = self.vectors[cand] @ Q[i]
+            top = np.argsort(-s)[:k]
+            sims[i, :len(top)], pos[i, :len(top)] = s[top], cand[top]
+        return sims, pos
+
+    def class_probabilities(self, sims, pos, num_class, temperature=TEMPERATURE):
+        """Similarity-weighted vote of the neighbours' labels."""
+        valid = pos >= 0
+        w = np.where(valid, np.exp((sims - np.max(sims, axis=1, keepdims=True)) / temperature), 0.0)
+        labels = np.where(valid, np.asarray(self.labels)[np.maximum(pos, 0)], 0)
+        probs = np.zeros((len(sims), num_class))
+        np.add.at(probs, (np.repeat(np.arange(len(sims)), sims.shape[1]), labels.ravel()), w.ravel())
+        return probs / np.maximum(probs.sum(axis=1, keepdims=True), 1e-12)
+
+    def neighbor_rows(self, sims, pos, n):
+        if self.rows is None:
+            return [[] for _ in range(len(pos))]
+        out = []
+        for s, p in zip(sims, pos):
+            keep = p[:n][p[:n] >= 0]
+            # missing values (e.g. no recommendation) become None, which JSON accepts
+            rows = self.rows.iloc[keep]
+            records = rows.astype(object).where(rows.notna(), None).to_dict("records")
+            for rec, sim in zip(records, s[:len(keep)]):
+                rec["similarity"] = round(float(sim), 4)
+            out.append(records)
+        return out
+
+
+def stale_reason(meta, embedder=None, classes=None):
+    """Why an index built with `meta` does not fit this embedder and class list, or None."""
+    from bundle import _weights_id
+
+    loaded = getattr(embedder, "cache_id", None)
+    if loaded and _weights_id(meta.get("embedder")) != _weights_id(loaded):
+        return f"built with embedder {meta.get('embedder')}, serving {loaded}"
+    if classes is not None and meta.get("classes") != list(map(str, classes)):
+        return "built for a different class list"
+    return None
+
+
+def load_neighbor_index(model_dir, embedder=None, classes=None):
+    """The saved index, or None if there is none or it does not match embedder/classes."""
+    path = os.path.join(model_dir, NEIGHBOR_DIR)
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    index = NeighborIndex.load(path)
+    reason = stale_reason(index.meta, embedder, classes)
+    if reason:
+        print(f"⚠️ Ignoring the neighbour index ({reason}); rebuild it with python neighbors.py")
+        return None
+    return index
+
+
+def build_neighbor_index(model_dir, data_path, embedder, le, nlist=None):
+    from embedding_cache import cached_encode
+
+    df = load_dataset(data_path, ROW_COLUMNS).dropna(subset=["input_text"]).reset_index(drop=True)
+    df = df[df["label"].isin(le.classes_)].reset_index(drop=True)
+    embeddings = cached_encode(embedder, df["input_text"].astype(str).tolist())
+    index, order = NeighborIndex.build(embeddings, le.transform(df["label"]), nlist=nlist)
+    rows = df.iloc[order].reset_index(drop=True)
+    rows["label"] = rows["label"].astype(str)
+    meta = {
+        "embedder": getattr(embedder, "cache_id", None),
+        "classes": list(map(str, le.classes_)),
+        "data": os.path.basename(data_path),
+        "size": len(rows),
+        "nlist": len(index.centroids),
+    }
+    index.save(os.path.join(model_dir, NEIGHBOR_DIR), rows=rows, meta=meta)
+    return index
+
+
+def main():
+    from loader import load_model_components, MODEL_DIR
+
+    parser = argparse.ArgumentParser(description="Build the nearest-neighbour index over dataset embeddings")
+    parser.add_argument("--data", default="./balanced_data.csv")
+    parser.add_argument("--nlist", type=int, default=None)
+    args = parser.parse_args()
+
+    embedder, _, le, _ = load_model_components()
+    index = build_neighbor_index(MODEL_DIR, args.data, embedder, le, nlist=args.nlist)
+    print(f"Indexed {len(index.vectors)} rows in {len(index.centroids)} lists")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# normalize_bench.py
+import argparse
+import re
+import time
+import pandas as pd
+from dataset_store import load_dataset
+from text_normalize import normalize_series
+from utils import ensure_outputs_folder
+
+OUT_PATH = "outputs/normalize_benchmark.csv"
+REPEATS = 5
+
+
+def clean_text_regex(text):
+    # the per-row cleaning model.py used before text_normalize
+    text = str(text).lower()
+    text = re.sub(r"http\S+|www\S+", "", text)
+    text = re.sub(r"[^a-zA-Z0-9\s]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def best_seconds(fn, texts):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        out = fn(texts)
+        times.append(time.perf_counter() - start)
+    return min(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text normalization throughput")
+    parser.add_argument("--data", default="./balanced_data.csv")
+    args = parser.parse_args()
+
+    ensure_outputs_folder()
+    texts = load_dataset(args.data, ["input_text"])["input_text"].dropna().astype(str).reset_index(drop=True)
+    bangla = texts.str.contains("[ঀ-৿]")
+
+    runs = {
+        "regex_apply": lambda s: s.apply(clean_text_regex),
+        "normalize_series": normalize_series,
+    }
+    rows = []
+    for name, fn in runs.items():
+        seconds, out = best_seconds(fn, texts)
+        rows.append({
+            "Method": name,
+            "Rows": len(texts),
+            "Seconds": round(seconds, 4),
+            "RowsPerSec": round(len(texts) / seconds),
+            "EmptyBanglaRows": int((out[bangla].str.len() <= 3).sum()),
+        })
+
+    report = pd.DataFrame(rows)
+    print(f"{len(texts)} rows, {texts.nunique()} distinct, {int(bangla.sum())} with Bengali script")
+    print(report.to_string(index=False))
+    report.to_csv(OUT_PATH, index=False)
+    print(f"Saved {OUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# projection.py
+import os
+import joblib
+from sklearn.pipeline import Pipeline
+
+# "none" feeds scaled embeddings straight to the booster; "pca" / "random" project them first
+PROJECTION = os.environ.get("PROJECTION", "none")
+PROJECTION_DIM = int(os.environ.get("PROJECTION_DIM", "128"))
+PROJECTION_FILE = "projection.joblib"
+
+
+def make_projection(kind=PROJECTION, dim=PROJECTION_DIM, seed=42):
+    if kind == "none":
+        return None
+    if kind == "pca":
+        from sklearn.decomposition import PCA
+        return PCA(n_components=dim, svd_solver="randomized", random_state=seed)
+    if kind == "random":
+        from sklearn.random_projection import GaussianRandomProjection
+        return GaussianRandomProjection(n_components=dim, random_state=seed)
+    raise ValueError(f"Unknown projection: {kind}")
+
+
+def save_projection(projection, model_dir):
+    path = os.path.join(model_dir, PROJECTION_FILE)
+    if projection is None:
+        # a projection left over from an earlier run would no longer match the model
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    joblib.dump(projection, path)
+
+
+def feature_transform(scaler, projection=None):
+    """The scaler alone, or scaler -> projection as one fitted Pipeline.
+
+    Callers only ever call .transform() on it, so predict paths, metrics and
+    LIME pick up the projection without knowing it exists.
+    """
+    if projection is None:
+        return scaler
+    return Pipeline([("scaler", scaler), ("projection", projection)])
+
+
+def load_feature_transform(model_dir):
+    # uncompressed joblib files, so the fitted arrays are memory-mapped rather than copied
+    scaler = joblib.load(os.path.join(model_dir, "scaler.joblib"), mmap_mode="r")
+    path = os.path.join(model_dir, PROJECTION_FILE)
+    projection = joblib.load(path, mmap_mode="r") if os.path.exists(path) else None
+    return feature_transform(scaler, projection)
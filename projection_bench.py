@@ -0,0 +1,72 @@
+# projection_bench.py
+import argparse
+import time
+import pandas as pd
+from model import prepare_training_data
+from projection import make_projection
+from training import build_datasets, train_booster, evaluate_booster
+from utils import ensure_outputs_folder
+
+OUT_PATH = "outputs/projection_benchmark.csv"
+DIMS = (32, 64, 128, 256)
+REPEATS = 20
+
+
+def predict_latency_ms(booster, projection, X_raw):
+    def predict():
+        X = projection.transform(X_raw) if projection is not None else X_raw
+        return booster.predict(X)
+    predict()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        predict()
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark projection sizes between scaler and booster")
+    parser.add_argument("--kinds", nargs="+", default=["pca", "random"], choices=["pca", "random"])
+    parser.add_argument("--dims", nargs="+", type=int, default=list(DIMS))
+    parser.add_argument("--boosting", default="gbdt")
+    parser.add_argument("--budget", type=float, default=None, help="training seconds per run")
+    args = parser.parse_args()
+
+    ensure_outputs_folder()
+    # scaled but unprojected embeddings, shared by every run
+    data = prepare_training_data(projection="none")
+    num_class = len(data.le.classes_)
+    full_dim = data.X_train.shape[1]
+
+    runs = [("none", full_dim)] + [(k, d) for k in args.kinds for d in args.dims if d < full_dim]
+    rows = []
+    for kind, dim in runs:
+        projection = make_projection(kind, dim)
+        start = time.perf_counter()
+        X_train = projection.fit_transform(data.X_train) if projection is not None else data.X_train
+        X_val = projection.transform(data.X_val) if projection is not None else data.X_val
+        fit_seconds = time.perf_counter() - start
+
+        train_data, val_data = build_datasets(X_train, data.y_train, X_val, data.y_val, data.w_train)
+        booster, seconds = train_booster(train_data, val_data, num_class, boosting=args.boosting, budget=args.budget)
+        metrics = evaluate_booster(booster, X_val, data.y_val)
+
+        rows.append({
+            "Projection": kind,
+            "Dim": dim,
+            "FitSeconds": round(fit_seconds, 2),
+            "Rounds": booster.current_iteration(),
+            "TrainSeconds": round(seconds, 1),
+            "Predict1Ms": round(predict_latency_ms(booster, projection, data.X_val[:1]), 2),
+            "Predict64Ms": round(predict_latency_ms(booster, projection, data.X_val[:64]), 2),
+            **metrics,
+        })
+        print(rows[-1])
+
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False))
+    report.to_csv(OUT_PATH, index=False)
+    print(f"Saved {OUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
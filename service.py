@@ -0,0 +1,233 @@
+# service.py
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+
+HOST = "0.0.0.0"
+PORT = 8000
+MAX_BATCH = 64
+MAX_WAIT_MS = 5
+MAX_TEXTS = 256  # per /predict/batch request
+TOP_K = 3
+MIN_CHARS = 3
+MAX_FEATURES = 20  # per /explain request
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-text requests into one predict_batch call.
+
+    The first queued text opens a window of max_wait seconds; everything that
+    arrives in it (up to max_batch texts) goes through predict_batch together
+    on a dedicated worker thread, so the event loop never blocks on the model.
+    If a batch fails, it is split in halves and retried, so only the
+    requests that fail on their own get the error.
+    """
+
+    def __init__(self, predict_batch, max_batch=MAX_BATCH, max_wait=MAX_WAIT_MS / 1000):
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.texts = 0
+        self._queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict")
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, text):
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    async def submit_many(self, texts):
+        return await asyncio.gather(*(self.submit(t) for t in texts))
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _predict_isolated(self, texts):
+        """predict_batch results, with its exception in place of each text that fails alone."""
+        try:
+            return list(self.predict_batch(texts))
+        except Exception as e:
+            if len(texts) == 1:
+                return [e]
+            mid = len(texts) // 2
+            return self._predict_isolated(texts[:mid]) + self._predict_isolated(texts[mid:])
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # drop requests whose client went away while queued
+            batch = [(t, f) for t, f in await self._collect() if not f.done()]
+            if not batch:
+                continue
+            texts = [t for t, _ in batch]
+            results = await loop.run_in_executor(self._executor, self._predict_isolated, texts)
+            self.batches += 1
+            self.texts += len(texts)
+            for (_, fut), result in zip(batch, results):
+                if fut.done():
+                    continue
+                if isinstance(result, Exception):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch": round(self.texts / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+def _valid_text(text):
+    return isinstance(text, str) and len(text.strip()) >= MIN_CHARS
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="request body must be JSON")
+
+
+def _require_ready(request):
+    if not request.app["state"]["ready"].is_set():
+        raise web.HTTPServiceUnavailable(text="model is still loading")
+
+
+async def handle_predict(request):
+    _require_ready(request)
+    body = await _json_body(request)
+    text = body.get("text") if isinstance(body, dict) else None
+    if not _valid_text(text):
+        raise web.HTTPBadRequest(text="'text' must be a symptom description of at least 3 characters")
+    return web.json_response(await request.app["batcher"].submit(text))
+
+
+async def handle_predict_batch(request):
+    _require_ready(request)
+    body = await _json_body(request)
+    texts = body.get("texts") if isinstance(body, dict) else None
+    if not isinstance(texts, list) or not texts or len(texts) > MAX_TEXTS or not all(map(_valid_text, texts)):
+        raise web.HTTPBadRequest(text=f"'texts' must be a list of 1-{MAX_TEXTS} symptom descriptions")
+    return web.json_response({"results": await request.app["batcher"].submit_many(texts)})
+
+
+async def handle_explain(request):
+    _require_ready(request)
+    body = await _json_body(request)
+    text = body.get("text") if isinstance(body, dict) else None
+    if not _valid_text(text):
+        raise web.HTTPBadRequest(text="'text' must be a symptom description of at least 3 characters")
+    num_features = body.get("num_features", 5)
+    # bool is an int subclass; JSON true/false is not a feature count
+    if not isinstance(num_features, int) or isinstance(num_features, bool) or not 1 <= num_features <= MAX_FEATURES:
+        raise web.HTTPBadRequest(text=f"'num_features' must be an integer from 1 to {MAX_FEATURES}")
+    loop = asyncio.get_running_loop()
+    features = await loop.run_in_executor(None, request.app["explain"], text, num_features)
+    return web.json_response({"features": [[f, float(w)] for f, w in features]})
+
+
+async def handle_health(request):
+    return web.json_response({"status": "ok", "batching": request.app["batcher"].stats()})
+
+
+async def handle_ready(request):
+    state = request.app["state"]
+    if not state["ready"].is_set():
+        return web.json_response({"ready": False, "error": state["load_error"]}, status=503)
+    return web.json_response({"ready": True, "version": request.app["version"]()})
+
+
+def make_app(predict_batch=None, explain_text=None, warm_up=None, version=None,
+             max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, top_k=TOP_K):
+    """Build the aiohttp app; the model functions default to model.py's.
+
+    The default warm_up also starts model.holder's watcher, so newly saved
+    model versions are served without a restart.
+    """
+    if predict_batch is None or explain_text is None or warm_up is None:
+        import model
+        predict_batch = predict_batch or (lambda texts: model.predict_patients(texts, top_k=top_k))
+        explain_text = explain_text or (lambda text, n: model.explain_text(text, num_features=n))
+        version = version or (lambda: model.get_registry().version)
+
+        def warm_up_and_watch():
+            model.get_registry().warm_up()
+            model.holder.watch()
+        warm_up = warm_up or warm_up_and_watch
+
+    app = web.Application()
+    app["batcher"] = MicroBatcher(predict_batch, max_batch=max_batch, max_wait=max_wait_ms / 1000)
+    app["explain"] = explain_text
+    app["version"] = version or (lambda: None)
+    # mutable, since the app itself is frozen once it starts
+    state = app["state"] = {"ready": asyncio.Event(), "load_error": None, "loader": None}
+
+    async def on_startup(app):
+        app["batcher"].start()
+
+        async def load():
+            # the server answers /healthz (and 503 elsewhere) while this runs
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, warm_up)
+                state["ready"].set()
+            except Exception as e:
+                state["load_error"] = repr(e)
+        state["loader"] = asyncio.get_running_loop().create_task(load())
+
+    async def on_cleanup(app):
+        state["loader"].cancel()
+        await app["batcher"].stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/predict", handle_predict)
+    app.router.add_post("/predict/batch", handle_predict_batch)
+    app.router.add_post("/explain", handle_explain)
+    app.router.add_get("/healthz", handle_health)
+    app.router.add_get("/readyz", handle_ready)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP inference service for the disease predictor")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    args = parser.parse_args()
+    app = make_app(max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, top_k=args.top_k)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
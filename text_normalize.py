@@ -0,0 +1,37 @@
+# text_normalize.py
+from functools import lru_cache
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# RE2 syntax (pyarrow.compute); the Bengali block and ZWNJ/ZWJ, which Bangla conjuncts use, are kept
+URL_PATTERN = r"http\S+|www\S+"
+DROP_PATTERN = r"[^a-z0-9\x{0980}-\x{09FF}\x{200C}\x{200D}\s]"
+SPACE_PATTERN = r"\s+"
+CACHE_SIZE = 65536
+
+
+def _normalize_array(arr):
+    arr = pc.utf8_lower(arr)
+    arr = pc.replace_substring_regex(arr, URL_PATTERN, "")
+    arr = pc.replace_substring_regex(arr, DROP_PATTERN, " ")
+    arr = pc.replace_substring_regex(arr, SPACE_PATTERN, " ")
+    return pc.utf8_trim_whitespace(arr)
+
+
+def normalize_series(texts):
+    """Lower-case, drop URLs and symbols, collapse whitespace over a whole column.
+
+    Each distinct text is normalized once, in one pass of Arrow's compiled
+    string kernels; the results are broadcast back to the original rows.
+    """
+    texts = pd.Series(texts)
+    # missing texts normalize to ""
+    codes, uniques = pd.factorize(texts.fillna("").astype(str), sort=False)
+    cleaned = _normalize_array(pa.array(uniques, type=pa.string())).to_numpy(zero_copy_only=False)
+    return pd.Series(cleaned[codes], index=texts.index, name=texts.name)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_text(text):
+    return normalize_series([text]).iloc[0]
@@ -0,0 +1,58 @@
+# train_compare.py
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from model import prepare_training_data
+from training import BOOSTING_PARAMS, build_datasets, train_booster, evaluate_booster
+from utils import ensure_outputs_folder
+
+OUT_PATH = "outputs/training_comparison.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare boosting modes on the same split")
+    parser.add_argument("--modes", nargs="+", default=list(BOOSTING_PARAMS), choices=list(BOOSTING_PARAMS))
+    parser.add_argument("--budget", type=float, default=None, help="training seconds per mode")
+    args = parser.parse_args()
+
+    ensure_outputs_folder()
+    data = prepare_training_data()
+    num_class = len(data.le.classes_)
+
+    rows = []
+    for mode in args.modes:
+        # the first call bins and saves the Datasets; later ones load the binaries
+        start = time.perf_counter()
+        train_data, val_data = build_datasets(data.X_train, data.y_train, data.X_val, data.y_val, data.w_train)
+        train_data.construct()
+        dataset_seconds = time.perf_counter() - start
+
+        booster, seconds = train_booster(train_data, val_data, num_class, boosting=mode, budget=args.budget)
+        metrics = evaluate_booster(booster, data.X_val, data.y_val)
+
+        one_row = data.X_val[:1]
+        booster.predict(one_row)
+        start = time.perf_counter()
+        for _ in range(20):
+            booster.predict(one_row)
+        latency_ms = (time.perf_counter() - start) / 20 * 1000
+
+        rows.append({
+            "Boosting": mode,
+            "Rounds": booster.current_iteration(),
+            "DatasetSeconds": round(dataset_seconds, 2),
+            "TrainSeconds": round(seconds, 1),
+            "PredictMs": round(latency_ms, 2),
+            **metrics,
+        })
+
+    report = pd.DataFrame(rows)
+    report["SecondsPerRound"] = np.round(report["TrainSeconds"] / report["Rounds"], 3)
+    print(report.to_string(index=False))
+    report.to_csv(OUT_PATH, index=False)
+    print(f"Saved {OUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
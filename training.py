@@ -0,0 +1,141 @@
+# training.py
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import lightgbm as lgb
+from sklearn.metrics import accuracy_score, f1_score, log_loss
+
+BOOSTING = os.environ.get("BOOSTING", "dart")
+DATASET_CACHE_DIR = "./cache/lgb_datasets"
+NUM_BOOST_ROUND = 900
+EARLY_STOPPING_ROUNDS = 70
+
+# Binning is fixed once a Dataset is constructed, so these key the saved binaries.
+# feature_pre_filter off keeps one binned Dataset valid for any min_data_in_leaf.
+DATASET_PARAMS = {"max_bin": 255, "feature_pre_filter": False, "verbosity": -1}
+
+BASE_PARAMS = {
+    "objective": "multiclass",
+    "learning_rate": 0.03,
+    "num_leaves": 256,
+    "max_depth": -1,
+    "feature_fraction": 0.85,
+    "min_data_in_leaf": 5,
+    "lambda_l1": 0.3,
+    "lambda_l2": 0.3,
+    "is_unbalance": True,
+    "metric": "multi_logloss",
+    "verbosity": -1,
+    "n_jobs": -1,
+    "seed": 42,
+}
+
+BOOSTING_PARAMS = {
+    # dart rescales dropped trees every round, so LightGBM ignores early stopping for it
+    "dart": {"boosting_type": "dart", "bagging_fraction": 0.85, "bagging_freq": 5},
+    "gbdt": {"boosting_type": "gbdt", "bagging_fraction": 0.85, "bagging_freq": 5},
+    # GOSS keeps large-gradient rows and samples the rest; it replaces bagging
+    "goss": {"boosting_type": "gbdt", "data_sample_strategy": "goss"},
+}
+
+
+def training_params(boosting, num_class, **overrides):
+    if boosting not in BOOSTING_PARAMS:
+        raise ValueError(f"Unknown boosting mode: {boosting}")
+    return {**BASE_PARAMS, **BOOSTING_PARAMS[boosting], "num_class": num_class, **overrides}
+
+
+def _fingerprint(*arrays):
+    h = hashlib.sha1(json.dumps(DATASET_PARAMS, sort_keys=True).encode("utf-8"))
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.dtype}{a.shape}".encode("utf-8"))
+        h.update(a.tobytes())
+    return h.hexdigest()[:16]
+
+
+def build_datasets(X_train, y_train, X_val, y_val, w_train=None, cache_dir=DATASET_CACHE_DIR):
+    """Binned train/val lgb.Datasets, saved as LightGBM binaries and reused.
+
+    The binaries are keyed by a hash of the inputs, so a rerun on the same
+    embeddings skips bin construction; any change in the data builds new ones.
+    w_train (per-row sample weights) is stored in the train binary.
+    """
+    y_train = np.asarray(y_train, dtype=np.int32)
+    y_val = np.asarray(y_val, dtype=np.int32)
+    weights = () if w_train is None else (np.asarray(w_train, dtype=np.float64),)
+    path = os.path.join(cache_dir, _fingerprint(X_train, y_train, X_val, y_val, *weights))
+    train_bin, val_bin = os.path.join(path, "train.bin"), os.path.join(path, "val.bin")
+
+    if os.path.exists(train_bin) and os.path.exists(val_bin):
+        train_data = lgb.Dataset(train_bin, params=DATASET_PARAMS)
+        val_data = lgb.Dataset(val_bin, reference=train_data, params=DATASET_PARAMS)
+        return train_data, val_data
+
+    train_data = lgb.Dataset(X_train, label=y_train, weight=w_train, params=DATASET_PARAMS)
+    val_data = lgb.Dataset(X_val, label=y_val, reference=train_data, params=DATASET_PARAMS)
+    os.makedirs(path, exist_ok=True)
+    for data, target in ((train_data, train_bin), (val_data, val_bin)):
+        data.save_binary(target + ".tmp")
+        os.replace(target + ".tmp", target)
+    return train_data, val_data
+
+
+def time_budget(seconds, keep_best=True):
+    """Callback that ends training once `seconds` have passed since the first round.
+
+    With keep_best, the booster keeps the round with the best validation
+    score so far, as early stopping would; dart rescales earlier trees, so
+    it passes keep_best=False and keeps the last round.
+    """
+    state = {}
+
+    def callback(env):
+        start = state.setdefault("start", time.perf_counter())
+        # the last validation set's first metric, as LightGBM's early stopping reports it
+        scores = [e for e in env.evaluation_result_list if e[0] != "training"]
+        if keep_best and scores:
+            score, higher_better = scores[-1][2], scores[-1][3]
+            best = state.get("best")
+            if best is None or (score > best[1] if higher_better else score < best[1]):
+                state["best"] = (env.iteration, score, env.evaluation_result_list)
+        if time.perf_counter() - start > seconds:
+            iteration, _, results = state.get("best") or (env.iteration, None, env.evaluation_result_list)
+            print(f"⏱️ Time budget of {seconds}s reached at round {env.iteration + 1}, keeping round {iteration + 1}")
+            raise lgb.callback.EarlyStopException(iteration, results)
+
+    callback.order = 40
+    return callback
+
+
+def train_booster(train_data, val_data, num_class, boosting=BOOSTING, num_boost_round=NUM_BOOST_ROUND,
+                  budget=None, init_model=None, callbacks=(), log_period=100, **overrides):
+    """Train one booster, or add rounds to init_model; returns (booster, training seconds)."""
+    callbacks = [lgb.log_evaluation(period=log_period), *callbacks]
+    if boosting != "dart":
+        callbacks.append(lgb.early_stopping(stopping_rounds=EARLY_STOPPING_ROUNDS))
+    if budget is not None:
+        callbacks.append(time_budget(budget, keep_best=boosting != "dart"))
+
+    start = time.perf_counter()
+    booster = lgb.train(
+        training_params(boosting, num_class, **overrides),
+        train_data,
+        valid_sets=[train_data, val_data],
+        num_boost_round=num_boost_round,
+        init_model=init_model,
+        callbacks=callbacks,
+    )
+    return booster, time.perf_counter() - start
+
+
+def evaluate_booster(booster, X_val, y_val):
+    probs_val = booster.predict(X_val)
+    preds_val = np.argmax(probs_val, axis=1)
+    return {
+        "Accuracy": round(accuracy_score(y_val, preds_val), 4),
+        "F1": round(f1_score(y_val, preds_val, average="weighted"), 4),
+        "LogLoss": round(log_loss(y_val, probs_val, labels=np.arange(probs_val.shape[1])), 4),
+    }
@@ -0,0 +1,139 @@
+# translation_cache.py
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from translation_client import get_client
+
+CACHE_PATH = "./cache/translations.sqlite"
+MAX_ENTRIES = 200_000
+MEMORY_ENTRIES = 4096
+
+
+def normalize_key_text(text):
+    text = unicodedata.normalize("NFC", str(text))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TranslationCache:
+    """Two-tier (memory + SQLite) LRU cache for translation results."""
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, memory_entries=MEMORY_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON cache(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(kind, source, target, text):
+        raw = "\x1f".join([kind, source or "", target or "", normalize_key_text(text)])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, kind, source, target, text):
+        key = self.make_key(kind, source, target, text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self._remember(key, row[0])
+            self.hits += 1
+            return row[0]
+
+    def put(self, kind, source, target, text, value):
+        key = self.make_key(kind, source, target, text)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, last_used) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._inserts += 1
+            # check the size bound every few hundred inserts, not on every write
+            if self._inserts % 256 == 0:
+                self._evict()
+            self._conn.commit()
+            self._remember(key, value)
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = TranslationCache()
+    return _cache
+
+
+def cached_translate(text, source="auto", target="en"):
+    cache = get_cache()
+    result = cache.get("translate", source, target, text)
+    if result is None:
+        result = get_client().translate(text, source=source, target=target)
+        if result is not None:
+            cache.put("translate", source, target, text, result)
+    return result
+
+
+def cached_translate_batch(texts, source="auto", target="en"):
+    cache = get_cache()
+    results = [cache.get("translate", source, target, t) for t in texts]
+    missing = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+    if missing:
+        # concurrent requests over the shared keep-alive pool; failures come back as None
+        translated = get_client().translate_batch(missing, source=source, target=target)
+        fresh = dict(zip(missing, translated))
+        for t, r in fresh.items():
+            if r is not None:
+                cache.put("translate", source, target, t, r)
+        results = [r if r is not None else fresh[t] for t, r in zip(texts, results)]
+    return results
@@ -0,0 +1,140 @@
+# translation_client.py
+import os
+import re
+import html
+import asyncio
+import threading
+
+# Any server speaking the translate.google.com/m protocol works, e.g. a local fake in tests
+TRANSLATE_URL = os.environ.get("TRANSLATE_URL", "https://translate.google.com/m")
+MAX_CONCURRENCY = 16
+TIMEOUT = 10.0  # seconds per request
+KEEPALIVE = 30.0
+MAX_CHARS = 5000
+
+_RESULT = re.compile(
+    r'<div[^>]*class="(?:result-container|t0)"[^>]*>(.*?)</div>', re.DOTALL | re.IGNORECASE
+)
+_TAGS = re.compile(r"<[^>]+>")
+
+
+class TranslationError(RuntimeError):
+    pass
+
+
+def parse_result(page):
+    match = _RESULT.search(page)
+    if match is None:
+        raise TranslationError("no translation in response")
+    return html.unescape(_TAGS.sub("", match.group(1))).strip()
+
+
+class AsyncTranslationClient:
+    """Translation client on one pooled keep-alive aiohttp session.
+
+    At most max_concurrency requests are in flight; each one gets its own
+    timeout. The session is created lazily inside the running loop and
+    must be closed with close() (or `async with`).
+    """
+
+    def __init__(self, base_url=TRANSLATE_URL, max_concurrency=MAX_CONCURRENCY,
+                 timeout=TIMEOUT, keepalive=KEEPALIVE):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self._session = None
+        self._semaphore = None
+
+    async def _get_session(self):
+        import aiohttp
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency, keepalive_timeout=self.keepalive
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def translate(self, text, source="auto", target="en"):
+        import aiohttp
+        text = str(text).strip()
+        if not text or source == target:
+            return text
+        if len(text) > MAX_CHARS:
+            raise TranslationError(f"text longer than {MAX_CHARS} characters")
+        session = await self._get_session()
+        params = {"sl": source, "tl": target, "q": text}
+        async with self._semaphore:
+            async with session.get(
+                self.base_url, params=params, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            ) as resp:
+                if resp.status != 200:
+                    raise TranslationError(f"HTTP {resp.status}")
+                page = await resp.text()
+        return parse_result(page)
+
+    async def translate_batch(self, texts, source="auto", target="en"):
+        # one failed text comes back as None instead of failing the batch
+        results = await asyncio.gather(
+            *(self.translate(t, source, target) for t in texts), return_exceptions=True
+        )
+        return [None if isinstance(r, BaseException) else r for r in results]
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class TranslationClient:
+    """Blocking facade: runs an AsyncTranslationClient on a background loop.
+
+    Safe to call from any thread, including ones that already run an event
+    loop of their own (e.g. Streamlit script threads).
+    """
+
+    def __init__(self, client=None):
+        self.client = client or AsyncTranslationClient()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def translate(self, text, source="auto", target="en"):
+        return self._run(self.client.translate(text, source, target))
+
+    def translate_batch(self, texts, source="auto", target="en"):
+        return self._run(self.client.translate_batch(list(texts), source, target))
+
+    def close(self):
+        self._run(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TranslationClient()
+    return _client
+
+
+def set_client(client):
+    """Swap the process-wide client, e.g. for one pointed at a fake server."""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,221 @@
+# tune.py
+import os
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from training import BOOSTING_PARAMS, NUM_BOOST_ROUND, DATASET_PARAMS, train_booster, evaluate_booster
+
+OUT_PATH = "outputs/tuning_leaderboard.csv"
+TUNE_DIR = "./cache/tune"
+N_TRIALS = 27
+MIN_ROUNDS = 50
+ETA = 3  # successive halving keeps the best 1/ETA of the trials at each rung
+LATENCY_REPEATS = 20
+SHARED_ARRAYS = ("X_train", "y_train", "w_train", "X_val", "y_val")
+
+# (kind, *args) per parameter; "boosting" picks one of training.BOOSTING_PARAMS
+SEARCH_SPACE = {
+    "boosting": ("choice", list(BOOSTING_PARAMS)),
+    "num_leaves": ("log_int", 15, 255),
+    "learning_rate": ("log", 0.01, 0.2),
+    "min_data_in_leaf": ("int", 5, 60),
+    "feature_fraction": ("uniform", 0.5, 1.0),
+    "lambda_l1": ("log", 1e-3, 1.0),
+    "lambda_l2": ("log", 1e-3, 1.0),
+}
+
+
+def sample_config(rng, space=SEARCH_SPACE):
+    config = {}
+    for name, (kind, *args) in space.items():
+        if kind == "choice":
+            config[name] = args[0][rng.integers(len(args[0]))]
+        elif kind == "int":
+            config[name] = int(rng.integers(args[0], args[1] + 1))
+        elif kind == "log_int":
+            config[name] = int(round(np.exp(rng.uniform(np.log(args[0]), np.log(args[1])))))
+        elif kind == "log":
+            config[name] = float(np.exp(rng.uniform(np.log(args[0]), np.log(args[1]))))
+        elif kind == "uniform":
+            config[name] = float(rng.uniform(args[0], args[1]))
+        else:
+            raise ValueError(f"Unknown search space kind: {kind}")
+    return config
+
+
+def rung_rounds(max_rounds, min_rounds=MIN_ROUNDS, eta=ETA):
+    """Cumulative boosting rounds per successive-halving rung, ending at max_rounds."""
+    rounds = []
+    r = min_rounds
+    while r < max_rounds:
+        rounds.append(r)
+        r *= eta
+    return rounds + [max_rounds]
+
+
+def share_arrays(data, path):
+    """Write the embedded split once; trial processes memory-map it read-only."""
+    os.makedirs(path, exist_ok=True)
+    for name in SHARED_ARRAYS:
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(data, name)))
+    return path
+
+
+_shared = {}
+
+
+def _init_worker(path, num_class, threads):
+    _shared.update({name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in SHARED_ARRAYS})
+    _shared.update(num_class=num_class, threads=threads)
+
+
+def latency_ms(booster, X):
+    booster.predict(X)
+    start = time.perf_counter()
+    for _ in range(LATENCY_REPEATS):
+        booster.predict(X)
+    return (time.perf_counter() - start) / LATENCY_REPEATS * 1000
+
+
+def run_trial(trial, config, rounds, model_dir, init_file=None):
+    """Train `trial` up to `rounds` total rounds, continuing from init_file if given.
+
+    dart trials always restart from scratch: continuing dart would rescale
+    the trees of the previous rung.
+    """
+    if config["boosting"] == "dart":
+        init_file = None
+    X_train, X_val = _shared["X_train"], _shared["X_val"]
+    train_data = lgb.Dataset(X_train, label=_shared["y_train"], weight=_shared["w_train"], params=DATASET_PARAMS)
+    val_data = lgb.Dataset(X_val, label=_shared["y_val"], reference=train_data, params=DATASET_PARAMS)
+    init_model = lgb.Booster(model_file=init_file) if init_file else None
+    done = init_model.current_iteration() if init_model is not None else 0
+
+    curve = {}
+    overrides = {k: v for k, v in config.items() if k != "boosting"}
+    booster, seconds = train_booster(
+        train_data, val_data, _shared["num_class"], boosting=config["boosting"],
+        num_boost_round=rounds - done, init_model=init_model, log_period=0,
+        callbacks=[lgb.record_evaluation(curve)], n_jobs=_shared["threads"], **overrides,
+    )
+    model_file = os.path.join(model_dir, f"trial_{trial:03d}.txt")
+    booster.save_model(model_file)
+
+    # every round this call ran; the returned booster is cut back to its best round
+    val_curve = curve["valid_1"]["multi_logloss"]
+    return {
+        "Trial": trial,
+        "Rounds": booster.current_iteration(),
+        # early stopping used up its patience before the rung budget: more rounds would not help
+        "Converged": len(val_curve) < rounds - done,
+        "Seconds": seconds,
+        "CurveLogLoss": round(min(val_curve), 4) if val_curve else None,
+        "Predict1Ms": round(latency_ms(booster, X_val[:1]), 2),
+        "Predict64Ms": round(latency_ms(booster, X_val[:64]), 2),
+        **evaluate_booster(booster, X_val, _shared["y_val"]),
+        "ModelFile": model_file,
+    }
+
+
+def pareto_front(report):
+    """True for trials no other trial beats on accuracy, train time and latency at once.
+
+    Only compare trials that finished training; a pruned trial's short
+    train time would otherwise put it on the front.
+    """
+    values = report[["Accuracy", "TrainSeconds", "Predict1Ms"]].to_numpy() * [-1, 1, 1]
+    dominated = [
+        bool(np.any(np.all(values <= v, axis=1) & np.any(values < v, axis=1))) for v in values
+    ]
+    return ~np.array(dominated)
+
+
+def search(data_dir, num_class, configs, schedule, workers, model_dir):
+    results, train_seconds = {}, {}
+    alive = list(range(len(configs)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker, initargs=(data_dir, num_class, threads),
+    ) as pool:
+        for rung, rounds in enumerate(schedule):
+            futures = [
+                pool.submit(run_trial, t, configs[t], rounds, model_dir,
+                            results[t]["ModelFile"] if t in results else None)
+                for t in alive
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                t = result["Trial"]
+                # a restarted dart trial's cost is its last run; others add up across rungs
+                carried = 0.0 if configs[t]["boosting"] == "dart" else train_seconds.get(t, 0.0)
+                train_seconds[t] = carried + result.pop("Seconds")
+                results[t] = {**result, "Rung": rung, "Pruned": False}
+                print(f"rung {rung} ({rounds} rounds) trial {t}: logloss {result['LogLoss']}, "
+                      f"accuracy {result['Accuracy']}")
+
+            if rung == len(schedule) - 1:
+                break
+            # prune on the validation multi_logloss curve reached at this rung
+            ranked = sorted(alive, key=lambda t: results[t]["CurveLogLoss"])
+            keep = max(1, len(ranked) // ETA)
+            for t in ranked[keep:]:
+                results[t]["Pruned"] = True
+            alive = [t for t in ranked[:keep] if not results[t]["Converged"]]
+            if not alive:
+                break
+
+    rows = [{**results[t], "TrainSeconds": round(train_seconds[t], 1), **configs[t]} for t in results]
+    report = pd.DataFrame(rows)
+    # trials that finished (last rung or converged) rank first; pruned ones by how far they got
+    report = pd.concat([
+        report[~report["Pruned"]].sort_values("LogLoss"),
+        report[report["Pruned"]].sort_values(["Rung", "LogLoss"], ascending=[False, True]),
+    ]).reset_index(drop=True)
+    finished = ~report["Pruned"]
+    report["Pareto"] = False
+    report.loc[finished, "Pareto"] = pareto_front(report[finished])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune LightGBM parameters on embeddings computed once")
+    parser.add_argument("--search", default="halving", choices=["halving", "random"])
+    parser.add_argument("--trials", type=int, default=N_TRIALS)
+    parser.add_argument("--max-rounds", type=int, default=NUM_BOOST_ROUND)
+    parser.add_argument("--min-rounds", type=int, default=MIN_ROUNDS)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from model import prepare_training_data
+    from utils import ensure_outputs_folder
+
+    ensure_outputs_folder()
+    data = prepare_training_data()
+    run_dir = os.path.join(TUNE_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    data_dir = share_arrays(data, os.path.join(run_dir, "data"))
+    model_dir = os.path.join(run_dir, "models")
+    os.makedirs(model_dir, exist_ok=True)
+
+    rng = np.random.default_rng(args.seed)
+    configs = [sample_config(rng) for _ in range(args.trials)]
+    # random search trains every trial to the full budget in a single rung
+    schedule = [args.max_rounds] if args.search == "random" else rung_rounds(args.max_rounds, args.min_rounds)
+    print(f"{args.trials} trials, rungs at {schedule} rounds, {args.workers} workers")
+
+    report = search(data_dir, len(data.le.classes_), configs, schedule, args.workers, model_dir)
+    print(report.drop(columns="ModelFile").to_string(index=False))
+    report.to_csv(OUT_PATH, index=False)
+    print(f"Saved {OUT_PATH}")
+    best = report.iloc[0]
+    print("Best parameters:", json.dumps(best[list(SEARCH_SPACE)].to_dict(), default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 # utils.py
-from deep_translator import GoogleTranslator
+from translation_cache import cached_translate
 import os
 
 def translate_text(text, target="en"):
     try:
-        return GoogleTranslator(source="auto", target=target).translate(text)
+        return cached_translate(text, source="auto", target=target)
     except:
         return text
 